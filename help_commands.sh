@@ -26,6 +26,9 @@ python src/minion_server.py --port 8006
 # send a test request to the master server
 curl -X POST "http://localhost:8000/upload-hashes" -F "file=@hashes.txt"
 
+# or crack on this machine only, without the servers
+python src/crack.py hashes.txt
+
 # status of the master server
 http://localhost:8000/status
 
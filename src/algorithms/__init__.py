@@ -0,0 +1,13 @@
+from .base_algorithm import HashAlgorithm, HashlibAlgorithm
+from .ntlm import NtlmAlgorithm
+
+# algorithms jobs can be cracked with, by the name uploads select them by
+ALGORITHMS: dict[str, HashAlgorithm] = {
+    "md5": HashlibAlgorithm("md5"),
+    "sha1": HashlibAlgorithm("sha1"),
+    "sha256": HashlibAlgorithm("sha256"),
+    "ntlm": NtlmAlgorithm(),
+    "md5_pass_salt": HashlibAlgorithm("md5", salt="append"),
+    "md5_salt_pass": HashlibAlgorithm("md5", salt="prepend"),
+}
+DEFAULT_ALGORITHM = "md5"
@@ -0,0 +1,115 @@
+import hashlib
+from binascii import unhexlify
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Optional
+
+from formatters.base_formats import Candidate
+
+
+class HashAlgorithm(ABC):
+    """
+    A hash function targets are cracked against.
+
+    Targets are identified by strings: the lowercase hex digest, followed by
+    ":salt" for salted algorithms (the hashcat hash-file format).
+    """
+
+    #: bytes of a digest
+    digest_size: int
+    #: whether every target carries its own salt
+    salted: bool = False
+
+    @abstractmethod
+    def digest(self, password: bytes, salt: bytes = b"") -> bytes:
+        """Hash one password (with the salt of its target)."""
+
+    def hasher(self, salt: bytes = b"") -> Callable[[Candidate], bytes]:
+        """A function hashing candidates under one salt."""
+        return lambda candidate: self.digest(candidate, salt)
+
+    def scan(self, candidates: Iterable[Candidate], targets: dict[bytes, str], salt: bytes = b"") -> dict[str, str]:
+        """Hash every candidate and return the cracked targets and their passwords.
+
+        `targets` maps raw digests (all with the same salt) to their target
+        strings. Stops early once every target is found.
+        """
+        found: dict[str, str] = {}
+        lookup = targets.get
+        digest = self.hasher(salt)
+        for candidate in candidates:
+            target = lookup(digest(candidate))
+            if target is not None:
+                found[target] = candidate.decode(errors="backslashreplace")
+                if len(found) == len(targets):
+                    break
+        return found
+
+    def parse_target(self, line: str) -> Optional[tuple[bytes, bytes]]:
+        """Split a target string into its raw digest and salt; None if malformed."""
+        hex_digest, _, salt = line.partition(":") if self.salted else (line, "", "")
+        try:
+            # unlike bytes.fromhex, unhexlify rejects embedded whitespace
+            digest = unhexlify(hex_digest)
+        except ValueError:
+            return None
+        if len(digest) != self.digest_size:
+            return None
+        return digest, salt.encode()
+
+    def verify(self, target: str, password: str) -> bool:
+        """Whether `password` hashes to a target string."""
+        parsed = self.parse_target(target)
+        return parsed is not None and self.digest(password.encode(), parsed[1]) == parsed[0]
+
+    def target(self, digest: bytes, salt: bytes = b"") -> str:
+        """The target string of a digest and salt."""
+        return f"{digest.hex()}:{salt.decode()}" if self.salted else digest.hex()
+
+
+class HashlibAlgorithm(HashAlgorithm):
+    """
+    A hashlib hash of the password, optionally with the salt appended
+    (`md5($pass.$salt)`) or prepended (`md5($salt.$pass)`).
+    """
+
+    def __init__(self, name: str, salt: Optional[str] = None) -> None:
+        if salt not in (None, "append", "prepend"):
+            raise ValueError(f"salt must be 'append' or 'prepend', got {salt!r}")
+        self.name = name
+        self.new = getattr(hashlib, name)
+        self.salt_position = salt
+        self.salted = salt is not None
+        self.digest_size = self.new().digest_size
+
+    def digest(self, password: bytes, salt: bytes = b"") -> bytes:
+        if self.salt_position == "prepend":
+            return self.new(salt + password).digest()
+        return self.new(password + salt).digest()
+
+    def hasher(self, salt: bytes = b"") -> Callable[[Candidate], bytes]:
+        new = self.new
+        if self.salt_position == "prepend":
+            # the salt is hashed once, its state copied for every candidate
+            copy = new(salt).copy
+
+            def digest(candidate: Candidate) -> bytes:
+                h = copy()
+                h.update(candidate)
+                return h.digest()
+            return digest
+        return lambda candidate: new(candidate + salt).digest()
+
+    def scan(self, candidates: Iterable[Candidate], targets: dict[bytes, str], salt: bytes = b"") -> dict[str, str]:
+        if self.salted:
+            return super().scan(candidates, targets, salt)
+        # the hot loop of unsalted hashes, without a call per candidate
+        found: dict[str, str] = {}
+        lookup = targets.get
+        new = self.new
+        for candidate in candidates:
+            target = lookup(new(candidate).digest())
+            if target is not None:
+                found[target] = candidate.decode(errors="backslashreplace")
+                if len(found) == len(targets):
+                    break
+        return found
@@ -0,0 +1,53 @@
+"""
+MD4 (RFC 1320), for NTLM when OpenSSL does not provide it.
+
+OpenSSL 3 moved MD4 to its legacy provider, so `hashlib.new("md4")` is often
+unavailable; this pure-Python version is a fallback, much slower than hashlib.
+"""
+
+import hashlib
+import struct
+from typing import Callable
+
+_MASK = 0xFFFFFFFF
+_BLOCK = struct.Struct("<16I")
+
+# the initial state, shared with the NumPy MD4 of NTLM
+INIT = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
+# (message word, shift) of the 16 steps of each round, and the constant of each round
+ROUND1 = [(k, (3, 7, 11, 19)[k % 4]) for k in range(16)]
+ROUND2 = [((k % 4) * 4 + k // 4, (3, 5, 9, 13)[k % 4]) for k in range(16)]
+ROUND3 = [((0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)[k], (3, 9, 11, 15)[k % 4])
+          for k in range(16)]
+ROUND_K = (0, 0x5A827999, 0x6ED9EBA1)
+
+
+def _rotl(x: int, s: int) -> int:
+    return ((x << s) | (x >> (32 - s))) & _MASK
+
+
+def md4_digest(data: bytes) -> bytes:
+    """The MD4 digest of `data`."""
+    length = len(data)
+    message = bytes(data) + b"\x80" + b"\x00" * ((55 - length) % 64) + (length * 8).to_bytes(8, "little")
+    h = list(INIT)
+    for offset in range(0, len(message), 64):
+        x = _BLOCK.unpack_from(message, offset)
+        a, b, c, d = h
+        for k, s in ROUND1:
+            a, b, c, d = d, _rotl((a + ((b & c) | (~b & d)) + x[k]) & _MASK, s), b, c
+        for k, s in ROUND2:
+            a, b, c, d = d, _rotl((a + ((b & c) | (b & d) | (c & d)) + x[k] + ROUND_K[1]) & _MASK, s), b, c
+        for k, s in ROUND3:
+            a, b, c, d = d, _rotl((a + (b ^ c ^ d) + x[k] + ROUND_K[2]) & _MASK, s), b, c
+        h = [(v + w) & _MASK for v, w in zip(h, (a, b, c, d))]
+    return struct.pack("<4I", *h)
+
+
+def md4_function() -> Callable[[bytes], bytes]:
+    """The fastest available function returning MD4 digests."""
+    try:
+        hashlib.new("md4")
+    except ValueError:
+        return md4_digest
+    return lambda data: hashlib.new("md4", data).digest()
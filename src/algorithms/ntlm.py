@@ -0,0 +1,104 @@
+"""
+NTLM: MD4 of the UTF-16LE password
+"""
+
+from typing import Callable, Iterable, Iterator
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from formatters.base_formats import Candidate
+from .base_algorithm import HashAlgorithm
+from .md4 import INIT, ROUND1, ROUND2, ROUND3, ROUND_K, md4_digest, md4_function
+
+# (message word, shift) of the 48 MD4 steps
+_STEPS = ROUND1 + ROUND2 + ROUND3
+
+BATCH = 4096  # candidates hashed per NumPy call
+
+
+def md4_blocks(words: "np.ndarray") -> "np.ndarray":
+    """MD4 of single padded blocks, one per row of 16 uint32 words; returns (N, 4) words."""
+    a, b, c, d = (np.full(words.shape[0], v, dtype=np.uint32) for v in INIT)
+    x = [np.ascontiguousarray(words[:, i]) for i in range(16)]
+    for step, (k, s) in enumerate(_STEPS):
+        if step < 16:
+            f = (b & c) | (~b & d)
+        elif step < 32:
+            f = (b & c) | (b & d) | (c & d)
+        else:
+            f = b ^ c ^ d
+        f += a
+        f += x[k]
+        if ROUND_K[step // 16]:
+            f += np.uint32(ROUND_K[step // 16])
+        a, d, c = d, c, b
+        b = (f << np.uint32(s)) | (f >> np.uint32(32 - s))
+    return np.stack([a + np.uint32(INIT[0]), b + np.uint32(INIT[1]),
+                     c + np.uint32(INIT[2]), d + np.uint32(INIT[3])], axis=1)
+
+
+class NtlmAlgorithm(HashAlgorithm):
+    """
+    NTLM (hashcat mode 1000). Uses hashlib's MD4 when OpenSSL provides it;
+    otherwise candidates are hashed in batches with NumPy when installed, or
+    with the (slow) pure-Python MD4.
+    """
+
+    digest_size = 16
+
+    def __init__(self) -> None:
+        self._md4 = md4_function()
+
+    @staticmethod
+    def encode(password: Candidate) -> bytes:
+        return password.decode(errors="surrogateescape").encode("utf-16-le", errors="surrogatepass")
+
+    def digest(self, password: bytes, salt: bytes = b"") -> bytes:
+        return self._md4(self.encode(password))
+
+    def hasher(self, salt: bytes = b"") -> Callable[[Candidate], bytes]:
+        md4, encode = self._md4, self.encode
+        return lambda candidate: md4(encode(candidate))
+
+    def scan(self, candidates: Iterable[Candidate], targets: dict[bytes, str], salt: bytes = b"") -> dict[str, str]:
+        if np is None or self._md4 is not md4_digest:
+            return super().scan(candidates, targets, salt)
+
+        found: dict[str, str] = {}
+        for batch in self._batches(candidates):
+            blocks = []
+            for encoded in batch:
+                if len(encoded) > 55:
+                    break
+                length = len(encoded)
+                blocks.append(encoded + b"\x80" + bytes(55 - length) + (length * 8).to_bytes(8, "little"))
+            if len(blocks) < len(batch):
+                # a password too long for one block: hash this batch one by one
+                digests = [self._md4(encoded) for encoded in batch]
+            else:
+                words = np.frombuffer(b"".join(blocks), dtype="<u4").reshape(-1, 16)
+                digests = md4_blocks(words).astype("<u4").tobytes()
+                digests = [digests[i:i + 16] for i in range(0, len(digests), 16)]
+            for encoded, digest in zip(batch, digests):
+                target = targets.get(digest)
+                if target is not None:
+                    found[target] = encoded.decode("utf-16-le", errors="surrogatepass").encode(
+                        errors="surrogateescape").decode(errors="backslashreplace")
+                    if len(found) == len(targets):
+                        return found
+        return found
+
+    def _batches(self, candidates: Iterable[Candidate]) -> Iterator[list[bytes]]:
+        """The UTF-16LE encoded candidates, BATCH at a time."""
+        encode = self.encode
+        batch: list[bytes] = []
+        for candidate in candidates:
+            batch.append(encode(candidate))
+            if len(batch) == BATCH:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
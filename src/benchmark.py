@@ -0,0 +1,53 @@
+"""
+Benchmark the hashing engines on the configured format.
+
+Usage: python src/benchmark.py [--count N] [--engines hashlib midstate] [--algorithm sha1]
+"""
+
+import argparse
+import time
+
+from algorithms import ALGORITHMS, DEFAULT_ALGORITHM
+from config import FORMATTER_TASK_NAME
+from engines import ENGINES
+from formatters import FORMATTERS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark hashing engines")
+    parser.add_argument("--count", type=int, default=2_000_000,
+                        help="Number of candidates to hash per engine")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES),
+                        help="Engines to benchmark")
+    parser.add_argument("--algorithm", choices=list(ALGORITHMS), default=DEFAULT_ALGORITHM,
+                        help="Hash algorithm to crack")
+    args = parser.parse_args()
+
+    fmt = FORMATTERS[FORMATTER_TASK_NAME]
+    start = fmt.min_value
+    end = min(fmt.max_value, start + args.count - 1)
+
+    # plant targets at both ends of the range so every engine must find them
+    algorithm = ALGORITHMS[args.algorithm]
+    salt = b"salt" if algorithm.salted else b""
+    passwords = [fmt.number_to_string(start), fmt.number_to_string(end)]
+    digests = {algorithm.digest(p.encode(), salt): p for p in passwords}
+    targets = {d: algorithm.target(d, salt) for d in digests}
+    # an unreachable target keeps the engines from stopping early
+    unreachable = bytes(algorithm.digest_size)
+    targets[unreachable] = algorithm.target(unreachable, salt)
+    expected = {algorithm.target(d, salt): p for d, p in digests.items()}
+
+    print(f"format={FORMATTER_TASK_NAME} algorithm={args.algorithm} candidates={end - start + 1:,}")
+    for name in args.engines:
+        engine = ENGINES[name]
+        began = time.perf_counter()
+        found = engine.search(fmt, targets, start, end, algorithm, salt)
+        elapsed = time.perf_counter() - began
+        status = "ok" if found == expected else f"MISMATCH {found}"
+        print(
+            f"{name:>10}: {(end - start + 1) / elapsed:>14,.0f} hashes/s ({elapsed:.2f}s) {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Build the full-keyspace digest index of a format.
+
+Shards are hashed in parallel and kept on disk until the final merge, so an
+interrupted build resumes where it stopped.
+
+Usage: python src/build_index.py [--format israel_phone] [--workers N]
+"""
+
+import argparse
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import FORMATTER_TASK_NAME, INDEX_DIR, MINION_WORKERS, index_file
+from formatters import FORMATTERS
+from lookup.digest_index import build_shard, merge_shards, shard_path
+from utils.worker_utils import chunk_range
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a digest index")
+    parser.add_argument("--format", type=str, default=FORMATTER_TASK_NAME,
+                        choices=list(FORMATTERS), help="Formatter to index")
+    parser.add_argument("--workers", type=int, default=MINION_WORKERS,
+                        help="Number of worker processes")
+    parser.add_argument("--shard-size", type=int, default=1_000_000,
+                        help="Numbers per shard")
+    args = parser.parse_args()
+
+    fmt = FORMATTERS[args.format]
+    if fmt.max_value - fmt.min_value >= 1 << 32:
+        raise SystemExit("Domain too large for a digest index")
+
+    target = index_file(args.format)
+    shard_dir = INDEX_DIR / f"{args.format}.shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    ranges = list(chunk_range(fmt.min_value, fmt.max_value, args.shard_size))
+    shards = [shard_path(shard_dir, i) for i in range(len(ranges))]
+    todo = [i for i, path in enumerate(shards) if not path.exists()]
+    print(f"{args.format}: {len(ranges)} shards, {len(ranges) - len(todo)} already built")
+
+    began = time.monotonic()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(build_shard, fmt, *ranges[i], shards[i]) for i in todo]
+        for done, future in enumerate(as_completed(futures), start=1):
+            future.result()
+            print(f"\rhashed {done}/{len(todo)} shards "
+                  f"({time.monotonic() - began:.0f}s)", end="", flush=True)
+    print()
+
+    print(f"merging into {target}")
+    merge_shards(fmt, shards, target)
+    shutil.rmtree(shard_dir)
+    print(f"done in {time.monotonic() - began:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Build a rainbow table for a format.
+
+Usage: python src/build_rainbow.py [--format israel_phone] --chains M --chain-length T [--workers N]
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import FORMATTER_TASK_NAME, INDEX_DIR, MINION_WORKERS, rainbow_file
+from formatters import FORMATTERS
+from lookup.rainbow_table import build_chains, write_table
+from utils.worker_utils import chunk_range
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a rainbow table")
+    parser.add_argument("--format", type=str, default=FORMATTER_TASK_NAME,
+                        choices=list(FORMATTERS), help="Formatter to cover")
+    parser.add_argument("--chains", type=int, required=True,
+                        help="Number of chains to generate")
+    parser.add_argument("--chain-length", type=int, required=True,
+                        help="Hashes per chain")
+    parser.add_argument("--workers", type=int, default=MINION_WORKERS,
+                        help="Number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=10_000,
+                        help="Chains per worker job")
+    args = parser.parse_args()
+
+    fmt = FORMATTERS[args.format]
+    domain_size = fmt.max_value - fmt.min_value + 1
+    if not 0 < args.chains <= min(domain_size, 1 << 32):
+        raise SystemExit(f"--chains must be between 1 and {min(domain_size, 1 << 32)}")
+    stride = domain_size // args.chains
+
+    target = rainbow_file(args.format)
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+
+    began = time.monotonic()
+    chains: list[tuple[int, int]] = []
+    batches = list(chunk_range(0, args.chains - 1, args.batch_size))
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(build_chains, fmt, args.chain_length, stride, first, last)
+                   for first, last in batches]
+        for done, future in enumerate(as_completed(futures), start=1):
+            chains.extend(future.result())
+            print(f"\rbuilt {done}/{len(batches)} batches "
+                  f"({time.monotonic() - began:.0f}s)", end="", flush=True)
+    print()
+
+    rate = write_table(fmt, chains, args.chain_length, args.chains, stride, target)
+    print(f"wrote {target}: success rate {rate:.1%}, "
+          f"done in {time.monotonic() - began:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Build the line-offset index of a wordlist, used by wordlist formats.
+
+Every machine that cracks the wordlist (the master and each minion) needs
+the wordlist and its index at the same path.
+
+Usage: python src/build_wordlist.py wordlists/rockyou.txt
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from formatters.wordlist_format import build_offsets, offsets_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build a wordlist offsets index")
+    parser.add_argument("wordlist", type=Path, help="Wordlist, one word per line")
+    args = parser.parse_args()
+
+    began = time.monotonic()
+    words = build_offsets(args.wordlist)
+    print(f"indexed {words:,} words of {args.wordlist} into {offsets_path(args.wordlist)} "
+          f"in {time.monotonic() - began:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ Configuration for the password cracker.
 """
 
 import argparse
+import os
 from pathlib import Path
 import sys
 import logging
@@ -18,10 +19,31 @@ MINION_SERVER_LOGGER = "minion_server"
 
 # Task configuration
 FORMATTER_TASK_NAME = "israel_phone"
-TASKS_DB_FILE = Path("tasks_db.json")
+TASKS_DB_FILE = Path("tasks_db.sqlite3")
+POTFILE = Path("cracked.potfile")  # every cracked hash, consulted before scheduling
 LOG_DIR = Path("logs")
+INDEX_DIR = Path("indexes")      # precomputed digest indexes and rainbow tables
+PRIORS_DIR = Path("priors")      # per-format prefix likelihoods ordering the keyspace search
+UPLOAD_CHUNK_SIZE = 1 << 20      # bytes of an uploaded hash file parsed at a time
+MAX_REPORTED_INVALID_LINES = 10  # line numbers of invalid hashes returned by /upload-hashes
+WORK_UNIT_SIZE = 10_000_000      # numbers per work unit for minions that report no hashrate
+WORK_UNIT_SECONDS = 10           # target duration of a work unit at the minion's reported hashrate
+LEASE_SECONDS = 30               # an assigned task returns to its job unless renewed within this time
+LEASE_CHECK_INTERVAL = 5         # seconds between scans for expired leases
+STRAGGLER_SECONDS = 2 * WORK_UNIT_SECONDS  # run time after which a task may get a speculative twin
 LOG_PROGRESS_INTERVAL = 100_000  # for cracking progress
-CANCEL_CHECK_INTERVAL = 10_000   # for checking if minion should stop
+CRACK_CHUNK_SIZE = 250_000       # candidates per worker job, cancellation is checked between chunks
+CHECKPOINT_INTERVAL = 5          # seconds between progress checkpoints a minion commits to the master
+EVENTS_KEEPALIVE = 15            # seconds between keep-alives on an idle minion event stream
+LONG_POLL_TIMEOUT = 30           # longest time /get-task holds a request until work shows up
+HTTP_KEEPALIVE = 30              # seconds the master keeps idle connections open for reuse
+SHUTDOWN_TIMEOUT = 5             # seconds the master waits for open requests when it stops
+MASTER_HTTP2 = False             # minions talk HTTP/2 (needs httpx[http2] and an HTTP/2 proxy; uvicorn speaks HTTP/1.1)
+MAX_UNITS_PER_MINION = 8         # units a minion may hold at once (batched and prefetched)
+MIN_WORK_UNIT_SIZE = CRACK_CHUNK_SIZE  # smallest work unit handed out
+MINION_WORKERS = os.cpu_count() or 1  # worker processes per minion
+CRACK_ENGINE = "midstate"        # key of the hashing engine in `engines`
+LOOKUP_WORKERS = os.cpu_count() or 1  # master processes walking rainbow chains
 
 
 def file_name(name: str, port: int | None = None) -> str:
@@ -30,6 +52,21 @@ def file_name(name: str, port: int | None = None) -> str:
     return f"{name}.log"
 
 
+def index_file(format_name: str) -> Path:
+    """Path of the digest index built for a formatter."""
+    return INDEX_DIR / f"{format_name}.md5.idx"
+
+
+def rainbow_file(format_name: str) -> Path:
+    """Path of the rainbow table built for a formatter."""
+    return INDEX_DIR / f"{format_name}.md5.rt"
+
+
+def priors_file(format_name: str) -> Path:
+    """Path of the prefix priors of a formatter."""
+    return PRIORS_DIR / f"{format_name}.txt"
+
+
 def setup_logger(name: str, log_level: int = logging.INFO, port: int | None = None) -> logging.Logger:
     """
     Set up a logger with consistent formatting and handlers.
@@ -82,6 +119,14 @@ def parse_args(description: str) -> argparse.Namespace:
                             help='Host to run the server on')
         parser.add_argument("--port", type=int, required=True,
                             help='Port to run the server on')
+        parser.add_argument("--workers", type=int, default=MINION_WORKERS,
+                            help='Number of worker processes used for cracking')
+        parser.add_argument("--engine", type=str, default=CRACK_ENGINE,
+                            help='Hashing engine used for cracking')
+        parser.add_argument("--prefetch", action="store_true",
+                            help='Lease the next unit while the current one is searched')
+        parser.add_argument("--batch", type=int, default=1,
+                            help='Units leased and returned per call to the master')
 
     args = parser.parse_args()
     args.log_level = getattr(logging, args.log_level.upper())
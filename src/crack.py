@@ -0,0 +1,179 @@
+"""
+Crack a hash file on this machine, without the master and minion servers.
+
+The keyspace of the format is cut into chunks searched by a process pool on
+every core, with the same engines as the minions. Cracked hashes are printed
+to stdout as `hash:password` as soon as they are found; progress goes to
+stderr. Exits with 0 once every hash is cracked, 1 if some were not found.
+
+Usage: python src/crack.py HASH_FILE [--algorithm ntlm] [--format israel_phone]
+                           [--workers N] [--engine midstate] [--potfile cracked.potfile]
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from pathlib import Path
+
+from algorithms import ALGORITHMS, DEFAULT_ALGORITHM
+from config import CRACK_CHUNK_SIZE, CRACK_ENGINE, FORMATTER_TASK_NAME, MINION_WORKERS
+from engines import ENGINES
+from formatters import FORMATTERS
+from formatters.base_formats import FormatStrategy
+from lookup.potfile import Potfile
+from utils.hash_parser import parse_hashes
+from utils.worker_utils import chunk_range, new_worker_pool, publish_targets, retire_targets, search_range
+
+PROGRESS_INTERVAL = 1.0  # seconds between progress lines
+REPUBLISH_INTERVAL = 10.0  # seconds between updates of the targets the workers search
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Crack a hash file on this machine")
+    parser.add_argument("hashes", type=str,
+                        help="File of hashes, one per line (`hash:salt` if salted); - for stdin")
+    parser.add_argument("--algorithm", choices=list(ALGORITHMS), default=DEFAULT_ALGORITHM,
+                        help="Hash algorithm of the file")
+    parser.add_argument("--format", type=str, default=FORMATTER_TASK_NAME,
+                        choices=list(FORMATTERS), help="Formatter whose keyspace is searched")
+    parser.add_argument("--workers", type=int, default=MINION_WORKERS,
+                        help="Number of worker processes")
+    parser.add_argument("--engine", choices=list(ENGINES), default=CRACK_ENGINE,
+                        help="Hashing engine")
+    parser.add_argument("--chunk-size", type=int, default=CRACK_CHUNK_SIZE,
+                        help="Candidates per worker job")
+    parser.add_argument("--potfile", type=Path,
+                        help="Skip the hashes cracked in this potfile and append the new ones")
+    parser.add_argument("--quiet", action="store_true", help="Do not report progress")
+    args = parser.parse_args()
+
+    algorithm = ALGORITHMS[args.algorithm]
+    fmt = FORMATTERS[args.format]
+    if args.hashes == "-":
+        parsed = parse_hashes(sys.stdin.buffer, algorithm=algorithm)
+    else:
+        with open(args.hashes, "rb") as f:
+            parsed = parse_hashes(f, algorithm=algorithm)
+    if parsed.invalid:
+        print(f"skipped {parsed.invalid} invalid lines, first at lines {parsed.invalid_lines}",
+              file=sys.stderr)
+    if not parsed.hash_values:
+        print("no hashes to crack", file=sys.stderr)
+        return 1
+
+    potfile = Potfile(args.potfile) if args.potfile else None
+    found: dict[str, str] = {}
+    if potfile is not None:
+        known = potfile.lookup_many(parsed.hash_values)
+        found = {h: p for h, p in known.items() if algorithm.verify(h, p)}
+        for hash_value, password in found.items():
+            print(f"{hash_value}:{password}", flush=True)
+
+    # the targets still to crack, grouped by salt; every group is one pass
+    groups: dict[bytes, dict[bytes, str]] = {}
+    for hash_value in parsed.hash_values:
+        if hash_value not in found:
+            digest, salt = algorithm.parse_target(hash_value)
+            groups.setdefault(salt, {})[digest] = hash_value
+    wanted = len(parsed.hash_values)
+
+    try:
+        if groups:
+            search(fmt, args, groups, found, potfile)
+    finally:
+        if potfile is not None:
+            potfile.close()
+
+    print(f"cracked {len(found)}/{wanted} {args.algorithm} hashes", file=sys.stderr)
+    return 0 if len(found) == wanted else 1
+
+
+def search(fmt: FormatStrategy, args: argparse.Namespace, groups: dict[bytes, dict[bytes, str]],
+           found: dict[str, str], potfile: Potfile | None) -> None:
+    """Search the keyspace until every target is found, reporting hits as they come."""
+    algorithm = ALGORITHMS[args.algorithm]
+    # make sure the engine agrees with the algorithm before trusting a miss
+    ENGINES[args.engine].self_check(fmt, algorithm=algorithm)
+
+    total = fmt.max_value - fmt.min_value + 1
+    chunks = chunk_range(fmt.min_value, fmt.max_value, args.chunk_size)
+    in_flight: dict[Future, int] = {}
+    tried = 0
+    started_at = last_report = time.monotonic()
+    # workers load the targets once per generation; cracked targets, and salt
+    # groups, are left out of the next one
+    generation, stale = 0, False
+    publish_targets(str(generation), groups)
+    published_at = started_at
+    pool = new_worker_pool(args.workers, args.engine)
+    try:
+        while True:
+            if stale and groups and time.monotonic() - published_at >= REPUBLISH_INTERVAL:
+                generation, stale = generation + 1, False
+                publish_targets(str(generation), groups)
+                published_at = time.monotonic()
+            # keep every worker busy
+            while groups and len(in_flight) < 2 * args.workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                future = pool.submit(search_range, fmt, args.algorithm, str(generation), *chunk)
+                in_flight[future] = chunk[1] - chunk[0] + 1
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                tried += in_flight.pop(future)
+                hits = {h: p for h, p in future.result().items() if h not in found}
+                for hash_value, password in hits.items():
+                    if not args.quiet:
+                        clear_progress()
+                    print(f"{hash_value}:{password}", flush=True)
+                    digest, salt = algorithm.parse_target(hash_value)
+                    del groups[salt][digest]
+                    if not groups[salt]:
+                        del groups[salt]
+                    stale = True
+                found.update(hits)
+                if potfile is not None:
+                    potfile.add_many(hits)
+
+            now = time.monotonic()
+            if not args.quiet and now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                report(tried, total, len(found), now - started_at)
+    except KeyboardInterrupt:
+        clear_progress()
+        print("interrupted", file=sys.stderr)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        for key in range(generation + 1):
+            retire_targets(str(key))
+    if not args.quiet:
+        report(tried, total, len(found), time.monotonic() - started_at)
+        if sys.stderr.isatty():
+            print(file=sys.stderr)
+
+
+def clear_progress() -> None:
+    """Erase the progress line on a terminal, so other output starts on a clean line."""
+    if sys.stderr.isatty():
+        print("\r\x1b[K", end="", file=sys.stderr, flush=True)
+
+
+def report(tried: int, total: int, cracked: int, elapsed: float) -> None:
+    """Report progress on stderr, rewriting one line on a terminal."""
+    rate = tried / max(elapsed, 1e-9)
+    eta = (total - tried) / rate if rate else 0
+    line = (f"{tried / total:6.1%} of {total:,} candidates, {rate:,.0f} hashes/s, "
+            f"{cracked} cracked, {elapsed:.0f}s elapsed, ~{eta:.0f}s left")
+    if sys.stderr.isatty():
+        print(f"\r\x1b[K{line}", end="", file=sys.stderr, flush=True)
+    else:
+        print(line, file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
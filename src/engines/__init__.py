@@ -0,0 +1,19 @@
+
+"""
+Hashing engines for the password cracker.
+"""
+
+from engines.base_engine import CrackEngine
+from engines.hashlib_engine import HashlibEngine
+from engines.midstate_engine import MidstateEngine
+from engines.numpy_engine import NumpyEngine, numpy_available
+
+
+ENGINES: dict[str, CrackEngine] = {
+    "hashlib": HashlibEngine(),
+    "midstate": MidstateEngine(),
+}
+
+# optional engines, only offered when their dependency is installed
+if numpy_available:
+    ENGINES["numpy"] = NumpyEngine()
@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+
+from algorithms import ALGORITHMS, DEFAULT_ALGORITHM, HashAlgorithm
+from formatters.base_formats import FormatStrategy
+
+MD5 = ALGORITHMS[DEFAULT_ALGORITHM]
+
+
+class CrackEngine(ABC):
+    @abstractmethod
+    def search(self, fmt: FormatStrategy, targets: dict[bytes, str], start: int, end: int,
+               algorithm: HashAlgorithm = MD5, salt: bytes = b"") -> dict[str, str]:
+        """Hash every candidate in [start..end] and return the cracked targets.
+
+        `targets` maps raw digests, all salted with `salt`, to their target
+        strings; the result maps the target string to the password. Stops
+        early once every target is found.
+        """
+
+    def self_check(self, fmt: FormatStrategy, count: int = 2_000, algorithm: HashAlgorithm = MD5) -> None:
+        """Check the engine against `algorithm.digest` on the first `count` candidates of `fmt`.
+
+        Raises RuntimeError if the engine misses or invents a password.
+        """
+        start = fmt.min_value
+        end = min(fmt.max_value, start + count - 1)
+        salt = b"salt" if algorithm.salted else b""
+        targets: dict[bytes, str] = {}
+        expected: dict[str, str] = {}
+        for n in {start, (start + end) // 2, end}:
+            password = fmt.number_to_string(n)
+            digest = algorithm.digest(password.encode(), salt)
+            targets[digest] = algorithm.target(digest, salt)
+            expected[targets[digest]] = password
+        # an unreachable target keeps the engine from stopping early
+        unreachable = bytes(algorithm.digest_size)
+        targets[unreachable] = algorithm.target(unreachable, salt)
+
+        found = self.search(fmt, targets, start, end, algorithm, salt)
+        if found != expected:
+            raise RuntimeError(
+                f"{type(self).__name__} disagrees with {algorithm.digest.__qualname__}: "
+                f"expected {expected}, got {found}")
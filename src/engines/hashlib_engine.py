@@ -0,0 +1,18 @@
+"""
+Plain hashlib engine
+"""
+
+from algorithms import HashAlgorithm
+from formatters.base_formats import FormatStrategy
+from .base_engine import MD5, CrackEngine
+
+
+class HashlibEngine(CrackEngine):
+    """
+    Hash every candidate the format encodes, one at a time.
+    Works with any format and algorithm.
+    """
+
+    def search(self, fmt: FormatStrategy, targets: dict[bytes, str], start: int, end: int,
+               algorithm: HashAlgorithm = MD5, salt: bytes = b"") -> dict[str, str]:
+        return algorithm.scan(fmt.encoded_candidates(start, end), targets, salt)
@@ -0,0 +1,64 @@
+"""
+Prefix-midstate engine
+"""
+
+from algorithms import HashAlgorithm, HashlibAlgorithm
+from formatters.base_formats import FormatStrategy
+from .base_engine import MD5
+from .hashlib_engine import HashlibEngine
+
+
+class MidstateEngine(HashlibEngine):
+    """
+    Walk the range in aligned blocks of 10**block_digits numbers. All candidates
+    of a block share their prefix, so the prefix is hashed once per block and
+    its state is copied for each precomputed suffix.
+    A prepended salt is hashed with the prefix, an appended one after each
+    suffix. Formats without a digit suffix, and algorithms other than plain
+    hashlib ones, fall back to the hashlib loop.
+    """
+
+    def __init__(self, block_digits: int = 4) -> None:
+        self.block_digits = block_digits
+        self._suffixes: dict[int, list[bytes]] = {}
+
+    def suffixes(self, digits: int) -> list[bytes]:
+        """All zero-padded suffixes of `digits` digits, in numeric order."""
+        if digits not in self._suffixes:
+            self._suffixes[digits] = [
+                f"{i:0{digits}d}".encode() for i in range(10 ** digits)]
+        return self._suffixes[digits]
+
+    def search(self, fmt: FormatStrategy, targets: dict[bytes, str], start: int, end: int,
+               algorithm: HashAlgorithm = MD5, salt: bytes = b"") -> dict[str, str]:
+        digits = min(self.block_digits, fmt.suffix_digits)
+        if digits == 0 or not isinstance(algorithm, HashlibAlgorithm):
+            return super().search(fmt, targets, start, end, algorithm, salt)
+        prepend = salt if algorithm.salt_position == "prepend" else b""
+        append = salt if algorithm.salt_position == "append" else b""
+
+        block = 10 ** digits
+        suffixes = self.suffixes(digits)
+        lookup = targets.get
+        found: dict[str, str] = {}
+
+        block_start = start - start % block
+        while block_start <= end:
+            prefix = fmt.number_to_string(block_start)[:-digits]
+            copy = algorithm.new(prepend + prefix.encode()).copy
+            lo = max(start, block_start) - block_start
+            hi = min(end, block_start + block - 1) - block_start
+
+            for suffix in suffixes[lo:hi + 1]:
+                h = copy()
+                h.update(suffix)
+                if append:
+                    h.update(append)
+                hash_value = lookup(h.digest())
+                if hash_value is not None:
+                    found[hash_value] = prefix + suffix.decode()
+
+            if len(found) == len(targets):
+                break
+            block_start += block
+        return found
@@ -0,0 +1,141 @@
+"""
+Vectorized NumPy MD5 engine
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from algorithms import HashAlgorithm, HashlibAlgorithm
+from formatters.base_formats import FormatStrategy
+from .base_engine import MD5
+from .hashlib_engine import HashlibEngine
+
+numpy_available = np is not None
+
+# MD5 per-step shift amounts and constants (RFC 1321)
+_SHIFTS = [7, 12, 17, 22] * 4 + [5, 9, 14, 20] * 4 + \
+    [4, 11, 16, 23] * 4 + [6, 10, 15, 21] * 4
+_K = [int(abs(math.sin(i + 1)) * 2 ** 32) & 0xFFFFFFFF for i in range(64)]
+_INIT = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476)
+
+
+def _message_word(step: int) -> int:
+    """Index of the message word consumed by an MD5 step."""
+    if step < 16:
+        return step
+    if step < 32:
+        return (5 * step + 1) % 16
+    if step < 48:
+        return (3 * step + 5) % 16
+    return (7 * step) % 16
+
+
+def md5_block(words: list) -> tuple:
+    """Run the MD5 compression of one padded block across all lanes.
+
+    `words` holds the 16 little-endian message words, each a uint32 array
+    (one value per lane) or a uint32 scalar when it is the same in every
+    lane. Returns the four digest words as uint32 arrays.
+    """
+    lanes = max(w.shape[0] for w in words if np.ndim(w))
+    a, b, c, d = (np.full(lanes, v, dtype=np.uint32) for v in _INIT)
+    for step in range(64):
+        if step < 16:
+            f = (b & c) | (~b & d)
+        elif step < 32:
+            f = (d & b) | (~d & c)
+        elif step < 48:
+            f = b ^ c ^ d
+        else:
+            f = c ^ (b | ~d)
+        f += a
+        f += np.uint32(_K[step])
+        f += words[_message_word(step)]
+        shift = _SHIFTS[step]
+        a, d, c = d, c, b
+        b = b + ((f << np.uint32(shift)) | (f >> np.uint32(32 - shift)))
+    return (a + np.uint32(_INIT[0]), b + np.uint32(_INIT[1]),
+            c + np.uint32(_INIT[2]), d + np.uint32(_INIT[3]))
+
+
+class NumpyEngine(HashlibEngine):
+    """
+    Hash a whole block of candidates per call: all candidates sharing a prefix
+    (10**block_digits of them) become lanes of uint32 arrays and go through the
+    MD5 rounds together. Candidates must fit one padded 64-byte block (up to
+    55 bytes), the format must declare `suffix_digits` and the algorithm must
+    be unsalted MD5; otherwise the plain hashlib loop is used.
+    """
+
+    def __init__(self, block_digits: int = 5) -> None:
+        self.block_digits = block_digits
+        self._suffix_words: dict[tuple[int, int], dict[int, "np.ndarray"]] = {}
+
+    def suffix_words(self, offset: int, digits: int) -> dict[int, "np.ndarray"]:
+        """Message words holding the suffix digits, per lane.
+
+        The suffix starts at byte `offset`; lane i holds the suffix of i.
+        Only the words the suffix touches are returned.
+        """
+        key = (offset, digits)
+        if key not in self._suffix_words:
+            lanes = np.arange(10 ** digits, dtype=np.uint32)
+            block = np.zeros((lanes.shape[0], 64), dtype=np.uint8)
+            for pos in range(digits):
+                place = np.uint32(10 ** (digits - 1 - pos))
+                block[:, offset + pos] = (lanes // place) % 10 + ord("0")
+            words = block.view("<u4")
+            first, last = offset // 4, (offset + digits - 1) // 4
+            self._suffix_words[key] = {
+                w: np.ascontiguousarray(words[:, w]) for w in range(first, last + 1)}
+        return self._suffix_words[key]
+
+    def match_lanes(self, prefix: bytes, digits: int, lo: int, hi: int, first_words: "np.ndarray") -> "np.ndarray":
+        """Hash lanes [lo..hi] of a prefix block and return the lanes whose first digest word is a target's."""
+        length = len(prefix) + digits
+        template = bytearray(64)
+        template[:len(prefix)] = prefix
+        template[length] = 0x80
+        template[56:64] = (length * 8).to_bytes(8, "little")
+        prefix_words = np.frombuffer(bytes(template), dtype="<u4").astype(np.uint32)
+
+        words: list = [prefix_words[w] for w in range(16)]
+        for w, column in self.suffix_words(len(prefix), digits).items():
+            words[w] = column[lo:hi + 1] | prefix_words[w]
+
+        a, _, _, _ = md5_block(words)
+        return np.flatnonzero(np.isin(a, first_words)) + lo
+
+    def search(self, fmt: FormatStrategy, targets: dict[bytes, str], start: int, end: int,
+               algorithm: HashAlgorithm = MD5, salt: bytes = b"") -> dict[str, str]:
+        digits = min(self.block_digits, fmt.suffix_digits)
+        md5 = isinstance(algorithm, HashlibAlgorithm) and algorithm.name == "md5" and not algorithm.salted
+        if not numpy_available or not md5 or digits == 0 or len(fmt.number_to_string(start).encode()) > 55:
+            return super().search(fmt, targets, start, end, algorithm, salt)
+
+        block = 10 ** digits
+        first_words = np.array(
+            [int.from_bytes(t[:4], "little") for t in targets], dtype=np.uint32)
+        found: dict[str, str] = {}
+
+        block_start = start - start % block
+        while block_start <= end:
+            prefix = fmt.number_to_string(block_start)[:-digits].encode()
+            lo = max(start, block_start) - block_start
+            hi = min(end, block_start + block - 1) - block_start
+
+            for lane in self.match_lanes(prefix, digits, lo, hi, first_words):
+                # confirm the full digest with hashlib
+                password = fmt.number_to_string(block_start + int(lane))
+                hash_value = targets.get(algorithm.digest(password.encode()))
+                if hash_value is not None:
+                    found[hash_value] = password
+
+            if len(found) == len(targets):
+                break
+            block_start += block
+        return found
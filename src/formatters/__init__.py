@@ -5,8 +5,11 @@ Formatters for the password cracker.
 
 from formatters.base_formats import FormatStrategy
 from formatters.israeli_phone_format import IsraeliPhoneFormat
+from formatters.mask_format import MaskFormat
 
 
 FORMATTERS: dict[str, FormatStrategy] = {
     "israel_phone": IsraeliPhoneFormat(),
+    # the same numbers as a mask; add masks here to crack other domains
+    "israel_phone_mask": MaskFormat("05?d-?d?d?d?d?d?d?d"),
 }
@@ -1,4 +1,35 @@
 from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Union
+
+# a candidate is only valid until the next one is produced
+Candidate = Union[bytes, bytearray]
+
+
+def odometer(first: bytes, positions: list[int], count: int) -> Iterator[bytearray]:
+    """Yield `count` consecutive candidates from `first`, counting in place.
+
+    `positions` are the indices of the decimal digits of the number in the
+    encoded string, least significant first. One buffer is updated and
+    yielded for every candidate, like an odometer: the last digit steps
+    through a run of up to ten values, and the others only change on a carry.
+    """
+    buf = bytearray(first)
+    units, carry = positions[0], positions[1:]
+    while True:
+        low = buf[units]
+        run = min(ord("9") + 1 - low, count)
+        for digit in range(low, low + run):
+            buf[units] = digit
+            yield buf
+        count -= run
+        if count <= 0:
+            return
+        buf[units] = ord("0")
+        for position in carry:
+            if buf[position] != ord("9"):
+                buf[position] += 1
+                break
+            buf[position] = ord("0")
 
 
 class FormatStrategy(ABC):
@@ -13,3 +44,66 @@ class FormatStrategy(ABC):
     @abstractmethod
     def number_to_string(self, num: int) -> str:
         """Format a single integer into its target string."""
+    @property
+    def suffix_digits(self) -> int:
+        """How many trailing characters of the string are the zero-padded last digits of the number.
+
+        Engines use this to share the hashing state of a common prefix;
+        0 means the format has no such suffix.
+        """
+        return 0
+
+    def encoded_candidates(self, start: int, end: int) -> Iterator[Candidate]:
+        """Yield the encoded strings of [start..end], in order.
+
+        Hashing loops use this instead of `number_to_string`. A yielded
+        buffer may be reused for the next candidate, so copy it with
+        `bytes()` to keep it. This fallback formats every number; formats
+        override it to produce candidates without new objects.
+        """
+        for num in range(start, end + 1):
+            yield self.number_to_string(num).encode()
+
+    def prefix_range(self, prefix: str) -> Optional[tuple[int, int]]:
+        """The integers whose strings start with `prefix`, if they form one range.
+
+        None if the format cannot map prefixes to ranges.
+        """
+        return None
+
+    def ranked_ranges(self, priors: Optional[dict[str, float]] = None) -> list[tuple[int, int]]:
+        """Ranges covering the domain once, most likely first.
+
+        Work units are carved in this order. `priors` maps string prefixes to
+        the relative likelihood of each string starting with them; a longer
+        prefix overrides a shorter one, and strings without a prior come last.
+        Without priors the domain is searched in ascending order. Formats
+        with a better model of their domain may override this.
+        """
+        # (start, end, weight) pieces of the domain, in ascending order
+        pieces = [(self.min_value, self.max_value, 0.0)]
+        for prefix in sorted(priors or {}, key=len):
+            bounds = self.prefix_range(prefix)
+            if bounds is None:
+                raise ValueError(f"Prefix {prefix!r} matches no range of the domain")
+            low, high = bounds
+            painted = []
+            for start, end, weight in pieces:
+                if end < low or start > high:
+                    painted.append((start, end, weight))
+                    continue
+                if start < low:
+                    painted.append((start, low - 1, weight))
+                painted.append((max(start, low), min(end, high), priors[prefix]))
+                if end > high:
+                    painted.append((high + 1, end, weight))
+            pieces = painted
+
+        ranked: list[tuple[int, int]] = []
+        # stable: equally likely ranges stay in ascending order
+        for start, end, _ in sorted(pieces, key=lambda piece: -piece[2]):
+            if ranked and ranked[-1][1] == start - 1:
+                ranked[-1] = (ranked[-1][0], end)
+            else:
+                ranked.append((start, end))
+        return ranked
@@ -2,7 +2,9 @@
 Example stub for future formats
 """
 
-from .base_formats import FormatStrategy
+from typing import Iterator
+
+from .base_formats import Candidate, FormatStrategy, odometer
 
 
 class ExampleFormat(FormatStrategy):
@@ -21,6 +23,15 @@ class ExampleFormat(FormatStrategy):
     def number_to_string(self, num: int) -> str:
         return f"EX-{num}"
 
+    def encoded_candidates(self, start: int, end: int) -> Iterator[Candidate]:
+        # numbers are not zero-padded: count separately through each width
+        while start <= end:
+            width = len(str(start))
+            last = min(end, 10 ** width - 1)
+            positions = list(range(2 + width, 2, -1))
+            yield from odometer(self.number_to_string(start).encode(), positions, last - start + 1)
+            start = last + 1
+
 
 if __name__ == "__main__":
     ex = ExampleFormat()
@@ -3,7 +3,12 @@
 Israeli phone format
 """
 
-from .base_formats import FormatStrategy
+from typing import Iterator, Optional
+
+from .base_formats import Candidate, FormatStrategy, odometer
+
+# indices of the 9 digits of the number in "05X-XXXXXXX", least significant first
+DIGIT_POSITIONS = [10, 9, 8, 7, 6, 5, 4, 2, 1]
 
 
 class IsraeliPhoneFormat(FormatStrategy):
@@ -22,6 +27,25 @@ class IsraeliPhoneFormat(FormatStrategy):
         """Highest integer in the domain."""
         return 599_999_999
 
+    @property
+    def suffix_digits(self) -> int:
+        """The 7 digits after the dash are the last 7 digits of the number."""
+        return 7
+
+    def encoded_candidates(self, start: int, end: int) -> Iterator[Candidate]:
+        """Count through the digits of one reused "05X-XXXXXXX" buffer."""
+        return odometer(self.number_to_string(start).encode(), DIGIT_POSITIONS, end - start + 1)
+
+    def prefix_range(self, prefix: str) -> Optional[tuple[int, int]]:
+        """The numbers starting with a prefix such as "052" or "052-12"."""
+        digits = prefix.replace("-", "")
+        if not digits.isdigit() or not digits.startswith("0") or len(digits) > 10:
+            return None
+        # the string is "0" followed by the 9 digits of the number
+        low = max(self.min_value, int(digits[1:].ljust(9, "0")))
+        high = min(self.max_value, int(digits[1:].ljust(9, "9")))
+        return (low, high) if low <= high else None
+
     def number_to_string(self, num: int) -> str:
         """Format a single integer into its target string."""
         s = f"{num:09d}"
@@ -0,0 +1,182 @@
+"""
+Mask formats (hashcat-style masks such as "?u?l?l?l?d?d")
+"""
+
+import string
+from typing import Iterator, Optional
+
+from .base_formats import Candidate, FormatStrategy
+
+# built-in charsets, by the letter following "?"
+CHARSETS = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+    "s": " " + string.punctuation,
+    "a": string.ascii_lowercase + string.ascii_uppercase + string.digits + " " + string.punctuation,
+}
+CUSTOM_CHARSETS = "1234"
+
+
+def expand_charset(spec: str, charsets: dict[str, str]) -> str:
+    """Expand the "?x" references of a charset definition, dropping repeated characters."""
+    chars = []
+    i = 0
+    while i < len(spec):
+        if spec[i] != "?":
+            chars.append(spec[i])
+        elif i + 1 == len(spec):
+            raise ValueError(f"Charset {spec!r} ends with '?'")
+        elif spec[i + 1] == "?":
+            chars.append("?")
+            i += 1
+        elif spec[i + 1] in charsets:
+            chars.extend(charsets[spec[i + 1]])
+            i += 1
+        else:
+            raise ValueError(f"Unknown charset ?{spec[i + 1]} in {spec!r}")
+        i += 1
+    return "".join(dict.fromkeys(chars))
+
+
+class MaskFormat(FormatStrategy):
+    """
+    Every string matching a mask, e.g. MaskFormat("05?d-?d?d?d?d?d?d?d").
+
+    Each "?x" position takes the characters of charset x ("?l" lowercase,
+    "?u" uppercase, "?d" digits, "?h"/"?H" hex, "?s" symbols, "?a" all of
+    those, "?1"-"?4" from `charsets`); "??" is a literal "?" and any other
+    character is itself. Integers map to strings as mixed-radix numbers
+    whose digits are the positions, the last position least significant.
+    """
+
+    def __init__(self, mask: str, charsets: Optional[dict[str, str]] = None) -> None:
+        available = dict(CHARSETS)
+        for key, spec in (charsets or {}).items():
+            if key not in CUSTOM_CHARSETS:
+                raise ValueError(f"Custom charsets are ?1 to ?4, got ?{key}")
+            available[key] = expand_charset(spec, CHARSETS)
+
+        self.mask = mask
+        # the template with a placeholder in every variable position
+        template: list[str] = []
+        # (index in the template, charset) of the variable positions, in order
+        self._slots: list[tuple[int, str]] = []
+        i = 0
+        while i < len(mask):
+            if mask[i] == "?" and i + 1 < len(mask) and mask[i + 1] != "?":
+                key = mask[i + 1]
+                if key not in available:
+                    raise ValueError(f"Unknown charset ?{key} in mask {mask!r}")
+                if not available[key]:
+                    raise ValueError(f"Charset ?{key} of mask {mask!r} is empty")
+                self._slots.append((len(template), available[key]))
+                template.append(available[key][0])
+                i += 2
+            elif mask[i] == "?" and i + 1 == len(mask):
+                raise ValueError(f"Mask {mask!r} ends with '?'")
+            else:
+                # "??" is a literal "?"
+                template.append(mask[i])
+                i += 2 if mask[i] == "?" else 1
+        self._template = template
+
+        self._size = 1
+        for _, chars in self._slots:
+            self._size *= len(chars)
+        # the odometer needs one byte per character
+        self._ascii = all(c.isascii() for c in template) and all(
+            chars.isascii() for _, chars in self._slots)
+
+    @property
+    def min_value(self) -> int:
+        """Lowest integer in the domain."""
+        return 0
+
+    @property
+    def max_value(self) -> int:
+        """Highest integer in the domain."""
+        return self._size - 1
+
+    @property
+    def suffix_digits(self) -> int:
+        """The trailing "?d" positions, which spell the last decimal digits of the number."""
+        digits = 0
+        for index, chars in reversed(self._slots):
+            if chars != string.digits or index != len(self._template) - 1 - digits:
+                break
+            digits += 1
+        return digits
+
+    def _indexes(self, num: int) -> list[int]:
+        """The charset index of every variable position, least significant first."""
+        indexes = []
+        for _, chars in reversed(self._slots):
+            num, index = divmod(num, len(chars))
+            indexes.append(index)
+        return indexes
+
+    def number_to_string(self, num: int) -> str:
+        """Format a single integer into its target string."""
+        chars = list(self._template)
+        for (position, charset), index in zip(reversed(self._slots), self._indexes(num)):
+            chars[position] = charset[index]
+        return "".join(chars)
+
+    def encoded_candidates(self, start: int, end: int) -> Iterator[Candidate]:
+        """Count through the positions of one reused buffer, a mixed-radix odometer."""
+        if not self._ascii:
+            yield from super().encoded_candidates(start, end)
+            return
+        count = end - start + 1
+        if count <= 0:
+            return
+        buf = bytearray(self.number_to_string(start).encode())
+        if not self._slots:
+            yield buf
+            return
+
+        indexes = self._indexes(start)
+        slots = [(position, chars.encode()) for position, chars in reversed(self._slots)]
+        (last, last_chars), carry = slots[0], slots[1:]
+        low = indexes[0]
+        while True:
+            run = min(len(last_chars) - low, count)
+            for char in last_chars[low:low + run]:
+                buf[last] = char
+                yield buf
+            count -= run
+            if count <= 0:
+                return
+            low = 0
+            buf[last] = last_chars[0]
+            for k, (position, chars) in enumerate(carry, 1):
+                index = indexes[k] + 1
+                if index < len(chars):
+                    indexes[k] = index
+                    buf[position] = chars[index]
+                    break
+                indexes[k] = 0
+                buf[position] = chars[0]
+
+    def prefix_range(self, prefix: str) -> Optional[tuple[int, int]]:
+        """The integers whose strings start with `prefix`: fixing leading positions leaves one range."""
+        if len(prefix) > len(self._template):
+            return None
+        variable = dict(self._slots)
+        value, span = 0, self._size
+        for position, char in enumerate(prefix):
+            if position not in variable:
+                if char != self._template[position]:
+                    return None
+                continue
+            chars = variable[position]
+            if char not in chars:
+                return None
+            span //= len(chars)
+            value = value * len(chars) + chars.index(char)
+        # the value of the fixed positions, scaled by the positions left
+        low = value * span
+        return low, low + span - 1
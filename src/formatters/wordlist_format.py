@@ -0,0 +1,240 @@
+"""
+Wordlist + rules formats (dictionary attacks)
+
+The integer domain indexes (word, rule) pairs: number = word * len(rules) + rule,
+so a range of numbers is a contiguous slice of the wordlist with every rule
+applied to each word. The wordlist is memory-mapped and never loaded: a
+line-offset index, built once with `build_offsets`, locates any word in O(1),
+so the master shards a multi-GB wordlist exactly like a numeric keyspace.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Callable, Iterator, Sequence, Union
+
+from .base_formats import Candidate, FormatStrategy
+
+# header of an offsets file: magic and the size of the wordlist it indexes
+OFFSETS_HEADER = struct.Struct("<4sQ")
+OFFSETS_MAGIC = b"WLO1"
+
+Rule = Callable[[bytes], bytes]
+
+
+def offsets_path(wordlist: Path) -> Path:
+    """Path of the line-offset index of a wordlist."""
+    return wordlist.with_name(wordlist.name + ".offsets")
+
+
+def build_offsets(wordlist: Path) -> int:
+    """Index where every line of a wordlist starts; returns the number of words.
+
+    The index holds the start offset of each line followed by the size of
+    the file, as little-endian uint64s. It is written to a temporary file and
+    renamed, so it is never partial.
+    """
+    offsets = array("Q", [0])
+    position = 0
+    with open(wordlist, "rb") as f:
+        for line in f:
+            position += len(line)
+            offsets.append(position)
+    if offsets.itemsize != 8:
+        raise RuntimeError("array('Q') is not 64-bit on this platform")
+
+    path = offsets_path(wordlist)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(OFFSETS_HEADER.pack(OFFSETS_MAGIC, position))
+        f.write(offsets.tobytes())
+    os.replace(tmp, path)
+    return len(offsets) - 1
+
+
+def _position(arg: str) -> int:
+    """A hashcat position argument: 0-9, then A-Z for 10-35."""
+    if arg.isdigit():
+        return int(arg)
+    if "A" <= arg <= "Z":
+        return ord(arg) - ord("A") + 10
+    raise ValueError(f"Invalid position {arg!r}")
+
+
+def _toggle_at(n: int) -> Rule:
+    def rule(w: bytes) -> bytes:
+        return w[:n] + w[n:n + 1].swapcase() + w[n + 1:]
+    return rule
+
+
+def _delete_at(n: int) -> Rule:
+    def rule(w: bytes) -> bytes:
+        return w[:n] + w[n + 1:]
+    return rule
+
+
+# rule functions without arguments, by their hashcat name
+SIMPLE_RULES: dict[str, Rule] = {
+    ":": lambda w: w,
+    "l": bytes.lower,
+    "u": bytes.upper,
+    "c": bytes.capitalize,
+    "C": lambda w: w[:1].lower() + w[1:].upper(),
+    "t": bytes.swapcase,
+    "r": lambda w: w[::-1],
+    "d": lambda w: w + w,
+    "f": lambda w: w + w[::-1],
+    "{": lambda w: w[1:] + w[:1],
+    "}": lambda w: w[-1:] + w[:-1],
+    "[": lambda w: w[1:],
+    "]": lambda w: w[:-1],
+}
+
+
+def compile_rule(rule: str) -> Rule:
+    """Compile a hashcat-style rule, such as "c$1$2", into a bytes function.
+
+    Supported: : l u c C t r d f { } [ ] $X ^X sXY @X TN DN pN (N is 0-9 or
+    A-Z). Functions apply left to right; spaces between them are ignored.
+    """
+    steps: list[Rule] = []
+    i = 0
+    while i < len(rule):
+        name = rule[i]
+        if name == " ":
+            i += 1
+            continue
+        if name in SIMPLE_RULES:
+            steps.append(SIMPLE_RULES[name])
+            i += 1
+            continue
+        arity = 2 if name == "s" else 1
+        args = rule[i + 1:i + 1 + arity]
+        if name not in "$^s@TDp" or len(args) < arity:
+            raise ValueError(f"Unsupported rule function {rule[i:i + 1 + arity]!r} in {rule!r}")
+        raw = args.encode()
+        if name == "$":
+            steps.append(lambda w, c=raw: w + c)
+        elif name == "^":
+            steps.append(lambda w, c=raw: c + w)
+        elif name == "s":
+            steps.append(lambda w, x=raw[:1], y=raw[1:]: w.replace(x, y))
+        elif name == "@":
+            steps.append(lambda w, x=raw: w.replace(x, b""))
+        elif name == "T":
+            steps.append(_toggle_at(_position(args)))
+        elif name == "D":
+            steps.append(_delete_at(_position(args)))
+        else:
+            steps.append(lambda w, n=_position(args): w * (n + 1))
+        i += 1 + arity
+
+    if not steps:
+        return SIMPLE_RULES[":"]
+    if len(steps) == 1:
+        return steps[0]
+
+    def apply(word: bytes) -> bytes:
+        for step in steps:
+            word = step(word)
+        return word
+    return apply
+
+
+def load_rules(path: Path) -> list[str]:
+    """Read a rule file: one rule per line, skipping blank lines and `#` comments."""
+    lines = path.read_text().splitlines()
+    return [line for line in lines if line.strip() and not line.startswith("#")]
+
+
+# open wordlists of this process, shared by every format object unpickled in it
+_mapped: dict[Path, tuple[mmap.mmap, memoryview]] = {}
+
+
+def _open(wordlist: Path) -> tuple[mmap.mmap, memoryview]:
+    """Memory-map a wordlist and its offsets index, once per process."""
+    if wordlist not in _mapped:
+        path = offsets_path(wordlist)
+        size = wordlist.stat().st_size
+        hint = f"run python src/build_wordlist.py {wordlist}"
+        if not path.exists():
+            raise ValueError(f"{path} is missing; {hint}")
+        with open(path, "rb") as f:
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, indexed_size = OFFSETS_HEADER.unpack_from(index)
+        if magic != OFFSETS_MAGIC or indexed_size != size:
+            index.close()
+            raise ValueError(f"{path} does not match {wordlist}; {hint}")
+        with open(wordlist, "rb") as f:
+            # an empty file cannot be mapped, and has no words anyway
+            words = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else mmap.mmap(-1, 1)
+        _mapped[wordlist] = words, memoryview(index)[OFFSETS_HEADER.size:].cast("Q")
+    return _mapped[wordlist]
+
+
+class WordlistFormat(FormatStrategy):
+    """
+    Every word of a wordlist (one per line) under every rule, e.g.
+    WordlistFormat("wordlists/rockyou.txt", rules=[":", "c", "$1", "c$1"]).
+
+    The files are opened on first use, so formats can be registered before
+    their wordlist exists; minions need the wordlist and its offsets index at
+    the same path as the master.
+    """
+
+    def __init__(self, wordlist: Union[str, Path], rules: Sequence[str] = (":",)) -> None:
+        if not rules:
+            raise ValueError("A wordlist format needs at least one rule")
+        self.wordlist = Path(wordlist)
+        self.rules = list(rules)
+        self._compiled = [compile_rule(rule) for rule in self.rules]
+
+    def __getstate__(self) -> dict:
+        # compiled rules are closures: recompile them after unpickling
+        return {"wordlist": self.wordlist, "rules": self.rules}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["wordlist"], state["rules"])
+
+    @property
+    def words(self) -> int:
+        """Number of words (lines) in the wordlist."""
+        return len(_open(self.wordlist)[1]) - 1
+
+    @property
+    def min_value(self) -> int:
+        """Lowest integer in the domain."""
+        return 0
+
+    @property
+    def max_value(self) -> int:
+        """Highest integer in the domain."""
+        return self.words * len(self.rules) - 1
+
+    def _words(self, first: int, last: int) -> Iterator[bytes]:
+        """Words `first` to `last`, without their line endings."""
+        data, offsets = _open(self.wordlist)
+        for i in range(first, last + 1):
+            word = data[offsets[i]:offsets[i + 1]]
+            yield word.rstrip(b"\r\n")
+
+    def number_to_string(self, num: int) -> str:
+        """Format a single integer into its target string."""
+        word_index, rule_index = divmod(num, len(self.rules))
+        word = next(self._words(word_index, word_index))
+        return self._compiled[rule_index](word).decode(errors="backslashreplace")
+
+    def encoded_candidates(self, start: int, end: int) -> Iterator[Candidate]:
+        """Stream the words of the range from the map, applying every rule to each."""
+        if start > end:
+            return
+        count = len(self.rules)
+        first_word, first_rule = divmod(start, count)
+        last_word, last_rule = divmod(end, count)
+        for word_index, word in enumerate(self._words(first_word, last_word), first_word):
+            low = first_rule if word_index == first_word else 0
+            high = last_rule if word_index == last_word else count - 1
+            for rule in self._compiled[low:high + 1]:
+                yield rule(word)
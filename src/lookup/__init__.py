@@ -0,0 +1,4 @@
+
+"""
+Precomputed lookups that answer hashes without brute force.
+"""
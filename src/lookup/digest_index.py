@@ -0,0 +1,151 @@
+"""
+Full-keyspace digest index.
+
+The index is a sorted table of fixed-size records, one per number in the
+domain: the first 8 bytes of the number's MD5 digest followed by the
+number's offset from `min_value` (uint32). A bucket table keyed by the
+first two digest bytes narrows every lookup to a few thousand records,
+which are then binary-searched straight from the memory-mapped file.
+
+File layout: header | bucket table (65537 x uint64) | records.
+"""
+
+import heapq
+import mmap
+import os
+import struct
+from hashlib import md5
+from pathlib import Path
+from typing import Generator, Optional
+
+from formatters.base_formats import FormatStrategy
+
+MAGIC = b"PCDIDX01"
+HEADER = struct.Struct("<8sQQQ")  # magic, record count, min_value, max_value
+PREFIX_SIZE = 8
+RECORD = struct.Struct(f">{PREFIX_SIZE}sI")
+BUCKETS = 1 << 16
+BUCKET_TABLE = struct.Struct(f"<{BUCKETS + 1}Q")
+DATA_OFFSET = HEADER.size + BUCKET_TABLE.size
+READ_BATCH = 65_536  # records read at once while merging
+
+
+def shard_path(shard_dir: Path, idx: int) -> Path:
+    """Path of the idx-th sorted shard of a build."""
+    return shard_dir / f"shard_{idx:05d}.bin"
+
+
+def build_shard(fmt: FormatStrategy, start: int, end: int, path: Path) -> Path:
+    """Hash [start..end], sort the records and write them to `path`.
+
+    The shard is written to a temporary file and renamed, so a finished shard
+    is never partial and an interrupted build can resume by skipping it.
+    """
+    base = fmt.min_value
+    records = [
+        RECORD.pack(md5(candidate).digest()[:PREFIX_SIZE], offset)
+        for offset, candidate in enumerate(fmt.encoded_candidates(start, end), start - base)
+    ]
+    records.sort()
+
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(b"".join(records))
+    os.replace(tmp, path)
+    return path
+
+
+def _read_records(path: Path) -> Generator[bytes, None, None]:
+    """Yield the raw records of a shard in order."""
+    with open(path, "rb") as f:
+        while chunk := f.read(RECORD.size * READ_BATCH):
+            for pos in range(0, len(chunk), RECORD.size):
+                yield chunk[pos:pos + RECORD.size]
+
+
+def merge_shards(fmt: FormatStrategy, shards: list[Path], path: Path) -> None:
+    """Merge sorted shards into the final index file at `path`."""
+    counts = [0] * BUCKETS
+    total = 0
+
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as out:
+        out.write(bytes(DATA_OFFSET))
+        for record in heapq.merge(*(_read_records(s) for s in shards)):
+            counts[(record[0] << 8) | record[1]] += 1
+            out.write(record)
+            total += 1
+
+        # bucket i spans records [table[i], table[i + 1])
+        table = [0] * (BUCKETS + 1)
+        for i, count in enumerate(counts):
+            table[i + 1] = table[i] + count
+
+        out.seek(0)
+        out.write(HEADER.pack(MAGIC, total, fmt.min_value, fmt.max_value))
+        out.write(BUCKET_TABLE.pack(*table))
+    os.replace(tmp, path)
+
+
+class DigestIndex:
+    """
+    Read-only view of a built index, memory-mapped.
+    """
+
+    def __init__(self, path: Path, fmt: FormatStrategy) -> None:
+        self.path = path
+        self.fmt = fmt
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, min_value, max_value = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a digest index")
+        if (min_value, max_value) != (fmt.min_value, fmt.max_value):
+            self.close()
+            raise ValueError(
+                f"{path} was built for [{min_value}..{max_value}], not [{fmt.min_value}..{fmt.max_value}]")
+        self._table = BUCKET_TABLE.unpack_from(self._mm, HEADER.size)
+
+    def close(self) -> None:
+        """Release the memory map."""
+        self._mm.close()
+        self._file.close()
+
+    def _key(self, i: int) -> bytes:
+        pos = DATA_OFFSET + i * RECORD.size
+        return self._mm[pos:pos + PREFIX_SIZE]
+
+    def lookup(self, hash_value: str) -> Optional[str]:
+        """Return the password of `hash_value`, or None if it is not in the domain."""
+        digest = bytes.fromhex(hash_value)
+        prefix = digest[:PREFIX_SIZE]
+        bucket = (digest[0] << 8) | digest[1]
+        lo, hi = self._table[bucket], self._table[bucket + 1]
+
+        # leftmost record with this prefix
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        # prefixes can collide, confirm every candidate with the full digest
+        while lo < self.count and self._key(lo) == prefix:
+            _, offset = RECORD.unpack_from(
+                self._mm, DATA_OFFSET + lo * RECORD.size)
+            password = self.fmt.number_to_string(self.fmt.min_value + offset)
+            if md5(password.encode()).digest() == digest:
+                return password
+            lo += 1
+        return None
+
+    def lookup_many(self, hash_values: list[str]) -> dict[str, str]:
+        """Resolve every hash found in the index."""
+        results: dict[str, str] = {}
+        for hash_value in hash_values:
+            password = self.lookup(hash_value)
+            if password is not None:
+                results[hash_value] = password
+        return results
@@ -0,0 +1,66 @@
+"""
+Potfile: persistent store of every cracked hash.
+
+The file is append-only, one `hash:password` line per cracked hash (salted
+hashes are `hash:salt:password`), so a crash can at most lose the line being
+written. The whole file is read once
+when it is opened to build an in-memory hash -> password index.
+
+Salts and passwords may both contain ':', so where the salt of a line ends
+is ambiguous: every reading is indexed under its target string (split from
+the hash at the first ':', like the hash-file parser), and lookups verify
+the password against the algorithm. Only lines are counted, and a hash is
+only skipped as known when its reading already gives the same password.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+
+class Potfile:
+    """
+    Append-only hash -> password store with an in-memory lookup index.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._index: dict[str, str] = {}
+        self._count = 0
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.rstrip("\n")
+                    # a torn last line has no ':' and is skipped; each ':'
+                    # may end the target (`hash`, `hash:salt`, `hash:sa:lt`...)
+                    end = line.find(":")
+                    self._count += end != -1
+                    while end != -1:
+                        self._index[line[:end]] = line[end + 1:]
+                        end = line.find(":", end + 1)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Close the underlying file."""
+        self._file.close()
+
+    def get(self, hash_value: str) -> Optional[str]:
+        """Return the known password of `hash_value`, if any."""
+        return self._index.get(hash_value)
+
+    def lookup_many(self, hash_values: list[str]) -> dict[str, str]:
+        """Return the known passwords among `hash_values`."""
+        return {h: self._index[h] for h in hash_values if h in self._index}
+
+    def add_many(self, results: dict[str, str]) -> None:
+        """Append the hashes that are not known yet and flush them to disk."""
+        # another line's spurious reading may hold the hash with another password
+        new = {h: p for h, p in results.items() if self._index.get(h) != p}
+        if not new:
+            return
+        self._file.write("".join(f"{h}:{p}\n" for h, p in new.items()))
+        self._file.flush()
+        self._index.update(new)
+        self._count += len(new)
@@ -0,0 +1,196 @@
+"""
+Rainbow tables (time-memory tradeoff) for domains too large to index fully.
+
+A chain starts at a number, hashes it, reduces the digest back into the
+domain with a position-dependent reduction and repeats `chain_length` times.
+Only the start and the end of each chain are stored, sorted by end point:
+a 12-byte record per chain (uint64 end offset, uint32 start index).
+
+File layout: header | records.
+"""
+
+import asyncio
+import math
+import mmap
+import multiprocessing
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import md5
+from pathlib import Path
+from typing import Optional
+
+from formatters.base_formats import FormatStrategy
+
+MAGIC = b"PCRAIN01"
+# magic, chain length, chain count, min_value, max_value, start stride, success rate
+HEADER = struct.Struct("<8sQQQQQd")
+RECORD = struct.Struct("<QI")  # end offset, start index
+
+
+def reduce(fmt: FormatStrategy, digest: bytes, position: int) -> int:
+    """Map a digest to a number of the domain; differs per chain position."""
+    size = fmt.max_value - fmt.min_value + 1
+    return fmt.min_value + (int.from_bytes(digest[:8], "little") + position) % size
+
+
+def _hash(fmt: FormatStrategy, num: int) -> bytes:
+    return md5(fmt.number_to_string(num).encode()).digest()
+
+
+def chain_start(fmt: FormatStrategy, stride: int, index: int) -> int:
+    """Start point of the index-th chain, spread evenly over the domain."""
+    return fmt.min_value + index * stride
+
+
+def chain_end(fmt: FormatStrategy, num: int, first: int, chain_length: int) -> int:
+    """Walk a chain from position `first` (holding `num`) to its end point."""
+    for position in range(first, chain_length):
+        num = reduce(fmt, _hash(fmt, num), position)
+    return num
+
+
+def build_chains(fmt: FormatStrategy, chain_length: int, stride: int, first: int, last: int) -> list[tuple[int, int]]:
+    """Compute (end offset, start index) of chains [first..last]."""
+    return [
+        (chain_end(fmt, chain_start(fmt, stride, i), 0, chain_length) - fmt.min_value, i)
+        for i in range(first, last + 1)
+    ]
+
+
+def success_rate(domain_size: int, chain_count: int, chain_length: int) -> float:
+    """Probability that a random number of the domain is covered by the table.
+
+    Tracks the expected number of distinct points per column as chains merge.
+    """
+    distinct = float(chain_count)
+    miss = 1.0
+    for _ in range(chain_length):
+        miss *= 1 - distinct / domain_size
+        distinct = domain_size * (1 - math.exp(-distinct / domain_size))
+    return 1 - miss
+
+
+def write_table(fmt: FormatStrategy, chains: list[tuple[int, int]], chain_length: int, chain_count: int, stride: int, path: Path) -> float:
+    """Sort the chains by end point and write the table.
+
+    Merged chains (same end point) are all kept: each still covers the points
+    before the merge. Returns the success rate recorded in the header.
+    """
+    chains.sort()
+    rate = success_rate(fmt.max_value - fmt.min_value + 1, chain_count, chain_length)
+
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as out:
+        out.write(HEADER.pack(MAGIC, chain_length, len(chains),
+                              fmt.min_value, fmt.max_value, stride, rate))
+        out.write(b"".join(RECORD.pack(end, start) for end, start in chains))
+    os.replace(tmp, path)
+    return rate
+
+
+class RainbowTable:
+    """
+    Read-only view of a built table, memory-mapped. Lookups spread the chain
+    walks of each hash over a pool of worker processes, started with
+    `start_workers`.
+    """
+
+    def __init__(self, path: Path, fmt: FormatStrategy, workers: int = 1) -> None:
+        self.path = path
+        self.fmt = fmt
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, self.chain_length, self.count, min_value, max_value,
+         self.stride, self.success_rate) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a rainbow table")
+        if (min_value, max_value) != (fmt.min_value, fmt.max_value):
+            self.close()
+            raise ValueError(
+                f"{path} was built for [{min_value}..{max_value}], not [{fmt.min_value}..{fmt.max_value}]")
+
+    def start_workers(self) -> None:
+        """Start the processes walking chains.
+
+        They are forked by a fork server (spawned where there is none), so
+        the pool can be started from a process that already runs threads.
+        """
+        if self._pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def close(self) -> None:
+        """Release the memory map and the worker pool."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self._mm.close()
+        self._file.close()
+
+    def _record(self, i: int) -> tuple[int, int]:
+        return RECORD.unpack_from(self._mm, HEADER.size + i * RECORD.size)
+
+    def starts_for(self, end: int) -> list[int]:
+        """Start points of every chain ending at `end`."""
+        offset = end - self.fmt.min_value
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        starts = []
+        while lo < self.count:
+            record_end, index = self._record(lo)
+            if record_end != offset:
+                break
+            starts.append(chain_start(self.fmt, self.stride, index))
+            lo += 1
+        return starts
+
+    def walk(self, digest: bytes, positions: range) -> Optional[str]:
+        """Try every chain position in `positions` for `digest`."""
+        for position in positions:
+            end = chain_end(self.fmt, reduce(self.fmt, digest, position),
+                            position + 1, self.chain_length)
+            for num in self.starts_for(end):
+                # regenerate the chain up to the guessed position
+                for step in range(position):
+                    num = reduce(self.fmt, _hash(self.fmt, num), step)
+                if _hash(self.fmt, num) == digest:
+                    return self.fmt.number_to_string(num)
+        return None
+
+    async def lookup(self, hash_value: str) -> Optional[str]:
+        """The password of a hash, if the table covers it.
+
+        Costs O(chain_length²) hashes, split over the workers: worker w takes
+        positions w, w + workers, ... so the work is balanced.
+        """
+        self.start_workers()
+        digest = bytes.fromhex(hash_value)
+        passwords = await asyncio.gather(*(
+            asyncio.wrap_future(self._pool.submit(
+                _walk_in_worker, self.path, self.fmt, digest,
+                range(self.chain_length - 1 - w, -1, -self.workers)))
+            for w in range(self.workers)))
+        return next((password for password in passwords if password is not None), None)
+
+
+# tables opened by each worker process, by path
+_worker_tables: dict[Path, RainbowTable] = {}
+
+
+def _walk_in_worker(path: Path, fmt: FormatStrategy, digest: bytes, positions: range) -> Optional[str]:
+    """Chain walk entry point for worker processes."""
+    if path not in _worker_tables:
+        _worker_tables[path] = RainbowTable(path, fmt)
+    return _worker_tables[path].walk(digest, positions)
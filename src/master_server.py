@@ -2,20 +2,32 @@
 Master server for the password cracker.
 """
 
+import asyncio
+import struct
+import zlib
 from contextlib import asynccontextmanager
-from typing import Any, AsyncIterator, Dict, List, Union
+from types import FrameType
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
 from datetime import datetime
+from uuid import uuid4
 
 import uvicorn
-from fastapi import FastAPI, Response, UploadFile, File, HTTPException, Query
-from fastapi.responses import RedirectResponse
-
-from config import FORMATTER_TASK_NAME, MASTER_SERVER_HOST, MASTER_SERVER_LOGGER, MASTER_SERVER_PORT, TASKS_DB_FILE, setup_logger, parse_args
-from models.models import HashTask, TaskStatus
-from models.schemas.request import DisconnectRequest, MinionRegistrationRequest, SubmitResultRequest
-from models.schemas.response import GetTaskResponse
-from utils.master_utils import get_hash_from_file, load_tasks_from_file, remove_assigned_tasks, save_tasks_to_file, save_temp_file, split_range
+from fastapi import FastAPI, Request, Response, UploadFile, File, HTTPException, Query
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+from algorithms import ALGORITHMS, DEFAULT_ALGORITHM
+from config import EVENTS_KEEPALIVE, FORMATTER_TASK_NAME, HTTP_KEEPALIVE, LEASE_CHECK_INTERVAL, LEASE_SECONDS, LONG_POLL_TIMEOUT, MASTER_SERVER_HOST, MAX_UNITS_PER_MINION, MASTER_SERVER_LOGGER, MASTER_SERVER_PORT, POTFILE, SHUTDOWN_TIMEOUT, TASKS_DB_FILE, setup_logger, parse_args
+from models.models import HashTask, Job, JobStatus, JobSummary, TaskStatus
+from models.schemas.request import BatchRequest, CheckpointRequest, DisconnectRequest, MinionRegistrationRequest, SubmitResultRequest
+from models.schemas.response import BatchResponse, GetTaskResponse, WorkUnit
+from utils.master_utils import load_digest_index, load_potfile, load_rainbow_table, load_ranking, load_task_store, minion_algorithms, read_uploaded_hashes, verify_results, work_unit_size
+from utils.intervals import interval_total
+from utils.minion_events import MinionEvents
+from utils.task_store import TaskStore
 from formatters import FORMATTERS
+from lookup.digest_index import DigestIndex
+from lookup.potfile import Potfile
+from lookup.rainbow_table import RainbowTable
 
 
 # Parse command line arguments
@@ -27,21 +39,170 @@ logger = setup_logger(MASTER_SERVER_LOGGER, log_level=args.log_level)
 # Store registered minions
 minions: Dict[str, dict] = {}
 
-# Store tasks
-tasks: Dict[str, HashTask] = {}
+# Store jobs and their outstanding tasks (set up in lifespan)
+tasks: Optional[TaskStore] = None
+
+# Event streams pushing cancellations to minions
+events = MinionEvents(EVENTS_KEEPALIVE)
+
+# Wakes up long-polling /get-task requests when work becomes available
+work_ready = asyncio.Condition()
+
+# Set once the server starts shutting down: long polls return at once
+shutting_down = False
+
+# Every hash cracked so far
+potfile: Optional[Potfile] = None
+
+# Precomputed index of the configured format, if one was built
+digest_index: Optional[DigestIndex] = None
+
+# Rainbow table of the configured format, used when there is no index
+rainbow_table: Optional[RainbowTable] = None
+
+# Rainbow table lookups running next to the brute force of their jobs
+lookup_stages: Set[asyncio.Task] = set()
+
+
+def notify_cancel(task_id: str, task: HashTask) -> None:
+    """Tell the minion running a task that it was cancelled."""
+    events.publish(task.assigned_to, "cancel", task_id)
+
+
+async def notify_work() -> None:
+    """Wake every /get-task request waiting for work."""
+    async with work_ready:
+        work_ready.notify_all()
+
+
+async def rainbow_stage(job_id: str, hash_values: List[str]) -> None:
+    """Look the hashes of a job up in the rainbow table while minions brute-force it.
+
+    Every hit is credited to the job as soon as it is found; hashes cracked
+    by the minions in the meantime are skipped, and the stage ends with its job.
+    """
+    found = 0
+    for hash_value in hash_values:
+        job = tasks.jobs.get(job_id)
+        if job is None:
+            break
+        if hash_value in job.results:
+            continue
+        password = await rainbow_table.lookup(hash_value)
+        if password is None:
+            continue
+        found += 1
+        potfile.add_many({hash_value: password})
+        job = tasks.add_results(job_id, {hash_value: password})
+        if job is not None and job.status == JobStatus.COMPLETED:
+            logger.info(
+                f"Job {job_id} completed: {len(job.results)} hashes cracked")
+    logger.info(
+        f"Resolved {found} of {len(hash_values)} hashes of job {job_id} from the rainbow table")
+
+
+def start_rainbow_stage(job_id: str, hash_values: List[str]) -> None:
+    """Run `rainbow_stage` in the background, logging its failure."""
+    def done(stage: asyncio.Task) -> None:
+        lookup_stages.discard(stage)
+        if not stage.cancelled() and stage.exception() is not None:
+            logger.error(f"Rainbow table lookup of job {job_id} failed:", exc_info=stage.exception())
+
+    stage = asyncio.create_task(rainbow_stage(job_id, hash_values))
+    lookup_stages.add(stage)
+    stage.add_done_callback(done)
+
+
+async def wait_for_work(deadline: float) -> bool:
+    """Wait until work may be available; False once `deadline` (loop time) has
+    passed or the server is shutting down."""
+    timeout = deadline - asyncio.get_running_loop().time()
+    if timeout <= 0 or shutting_down:
+        return False
+    async with work_ready:
+        try:
+            await asyncio.wait_for(work_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    return not shutting_down
+
+
+def begin_shutdown() -> None:
+    """End the event streams and release the long polls, so their connections can close."""
+    global shutting_down
+    shutting_down = True
+    events.close()
+    asyncio.ensure_future(notify_work())
+
+
+class MasterServer(uvicorn.Server):
+    """
+    uvicorn server that ends long-lived requests as soon as a shutdown signal
+    arrives. uvicorn waits for open connections before running the lifespan
+    shutdown, and event streams never finish on their own.
+    """
+
+    async def startup(self, sockets: Optional[list] = None) -> None:
+        self._loop = asyncio.get_running_loop()
+        await super().startup(sockets)
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        super().handle_exit(sig, frame)
+        # called from the signal handler: hand over to the event loop
+        loop = getattr(self, "_loop", None)
+        if loop is not None:
+            loop.call_soon_threadsafe(begin_shutdown)
+
+
+async def expire_leases() -> None:
+    """Requeue tasks whose lease ran out and mark silent minions inactive."""
+    while True:
+        await asyncio.sleep(LEASE_CHECK_INTERVAL)
+        try:
+            expired = tasks.expire_leases()
+            for task_id, task in expired:
+                logger.warning(
+                    f"Lease of task {task_id} held by {task.assigned_to} expired, requeued {task.resume_from}–{task.end}")
+            if expired:
+                await notify_work()
+
+            now = datetime.now()
+            for minion_id, data in minions.items():
+                last_seen = data.get("last_heartbeat", data["registered_at"])
+                if data["status"] == "active" and (now - last_seen).total_seconds() > LEASE_SECONDS:
+                    logger.warning(
+                        f"Minion {minion_id} missed its heartbeats since {last_seen}")
+                    data["status"] = "inactive"
+        except Exception as e:
+            logger.error("Error expiring leases:", exc_info=e)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Lifespan events for the application."""
     # Startup
-    global tasks
+    global tasks, potfile, digest_index, rainbow_table
 
     logger.info("Master server is starting")
-    tasks = load_tasks_from_file(TASKS_DB_FILE)
+    tasks = load_task_store(TASKS_DB_FILE, load_ranking(FORMATTER_TASK_NAME))
+    tasks.on_cancel = notify_cancel
+    potfile = load_potfile(POTFILE)
+    digest_index = load_digest_index(FORMATTER_TASK_NAME)
+    if digest_index is None:
+        rainbow_table = load_rainbow_table(FORMATTER_TASK_NAME)
+    task_expire_leases = asyncio.create_task(expire_leases())
     yield
     # Shutdown
-    save_tasks_to_file(TASKS_DB_FILE, tasks)
+    task_expire_leases.cancel()
+    for stage in list(lookup_stages):
+        stage.cancel()
+    events.close()
+    tasks.close()
+    potfile.close()
+    if digest_index is not None:
+        digest_index.close()
+    if rainbow_table is not None:
+        rainbow_table.close()
     logger.info("Master server is shutting down")
 
 # Create FastAPI app
@@ -64,6 +225,7 @@ async def register_minion(minion: MinionRegistrationRequest) -> Dict[str, str]:
             "host": minion.host,
             "port": minion.port,
             "capabilities": minion.capabilities,
+            "hashrates": dict(minion.hashrates),
             "status": "active",
             "registered_at": datetime.now()
         })
@@ -73,6 +235,7 @@ async def register_minion(minion: MinionRegistrationRequest) -> Dict[str, str]:
             "host": minion.host,
             "port": minion.port,
             "capabilities": minion.capabilities,
+            "hashrates": dict(minion.hashrates),
             "status": "active",
             "registered_at": datetime.now()
         }
@@ -90,8 +253,9 @@ async def disconnect_minion(req: DisconnectRequest) -> Dict[str, str]:
 
     minions[req.minion_id]["status"] = "disconnected"
 
-    # change assigned tasks to pending
-    remove_assigned_tasks(tasks, req.minion_id)
+    # give assigned ranges back to their jobs
+    tasks.requeue_minion(req.minion_id)
+    await notify_work()
 
     logger.info(
         f"Minion {req.minion_id} disconnected successfully")
@@ -108,7 +272,8 @@ async def list_minions() -> Dict[str, List[Dict[str, Any]]]:
                 "host": data["host"],
                 "port": data["port"],
                 "status": data["status"],
-                "capabilities": data["capabilities"]
+                "capabilities": data["capabilities"],
+                "hashrates": data["hashrates"]
             }
             for mid, data in minions.items()
         ]
@@ -124,41 +289,146 @@ async def minion_heartbeat(minion_id: str) -> Dict[str, str]:
 
     minions[minion_id]["last_heartbeat"] = datetime.now()
     minions[minion_id]["status"] = "active"
+    tasks.renew_minion(minion_id)
     return {"status": "success"}
 
 
+@app.get("/minions/{minion_id}/events")
+async def minion_events(minion_id: str) -> StreamingResponse:
+    """Server-sent events for a minion, such as `cancel` with a task id as data."""
+    if minion_id not in minions:
+        raise HTTPException(
+            status_code=404, detail=f"Minion {minion_id} not found")
+    return StreamingResponse(events.stream(minion_id), media_type="text/event-stream")
+
+
+def record_hashrate(minion_id: str, algorithm: str, hashrate: float) -> None:
+    """Remember the hashes per second a minion measured with an algorithm."""
+    if hashrate > 0 and algorithm in ALGORITHMS:
+        minions[minion_id]["hashrates"][algorithm] = hashrate
+
+
+def unit_sizes(minion_id: str) -> Dict[str, int]:
+    """The algorithms a minion can crack, with the size of its units of each.
+
+    Units last about WORK_UNIT_SECONDS at the rate the minion last reported
+    for the algorithm.
+    """
+    data = minions[minion_id]
+    return {algorithm: work_unit_size(data["hashrates"].get(algorithm, 0.0))
+            for algorithm in minion_algorithms(data["capabilities"])}
+
+
+def capable_minions(algorithm: str) -> Dict[str, int]:
+    """The active minions that can crack `algorithm`, with the size of the units they get."""
+    capable = {}
+    for minion_id, data in minions.items():
+        if data["status"] == "active" and algorithm in minion_algorithms(data["capabilities"]):
+            capable[minion_id] = unit_sizes(minion_id)[algorithm]
+    return capable
+
+
+def job_summary(summary: JobSummary) -> Dict[str, Any]:
+    """JSON-friendly progress of a job, without its hash list."""
+    fmt = FORMATTERS[FORMATTER_TASK_NAME]
+    return {
+        **summary.model_dump(mode="json"),
+        "searched": interval_total(summary.searched),
+        "keyspace": fmt.max_value - fmt.min_value + 1,
+    }
+
+
 @app.post("/upload-hashes")
-async def upload_hashes(file: UploadFile = File(...)) -> Dict[str, str]:
-    """Upload a file containing MD5 hashes."""
+async def upload_hashes(file: UploadFile = File(...),
+                        algorithm: str = Query(DEFAULT_ALGORITHM, description=f"Hash algorithm of the file: {', '.join(ALGORITHMS)}"),
+                        priority: int = Query(0, description="Higher-priority jobs get minions first and preempt lower ones"),
+                        weight: float = Query(1.0, gt=0, description="Share of work units among jobs of the same priority")) -> Dict[str, Any]:
+    """Upload a file of hashes, one per line (`hash:salt` for salted algorithms).
+
+    Any number of jobs run at once; minions are shared between them by
+    priority and weight. All hashes of the file form a single job, resolved
+    in stages:
+    1) hashes already in the potfile are answered right away;
+    2) for MD5, a digest index of the configured format (if built) answers
+       the rest;
+    3) otherwise the hashes still unknown are brute-forced: minions that can
+       crack the algorithm carve work units out of the job's keyspace as they
+       ask for work. Meanwhile a rainbow table (MD5 only, if built) is
+       searched in the background, crediting hits to the job as it finds them.
+    """
+    if algorithm not in ALGORITHMS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown algorithm {algorithm!r}, expected one of {', '.join(ALGORITHMS)}")
+    hash_algorithm = ALGORITHMS[algorithm]
+    # the digest index and rainbow table hold MD5 digests
+    lookups = algorithm == "md5"
     try:
-        if any(t.status in (TaskStatus.PENDING, TaskStatus.ASSIGNED) for t in tasks.values()):
-            raise HTTPException(status_code=429, detail="Server is busy")
-        if len(minions) == 0:
+        # Parse hashes (validated, deduplicated, order preserved)
+        parsed = await read_uploaded_hashes(file, hash_algorithm)
+        hash_values = parsed.hash_values
+        fmt = FORMATTERS[FORMATTER_TASK_NAME]
+        logger.info(
+            f"master got {len(hash_values)} {algorithm} hashes from {parsed.lines} lines "
+            f"({parsed.duplicates} duplicates, {parsed.invalid} invalid)")
+        if parsed.invalid:
+            logger.warning(
+                f"Skipped {parsed.invalid} invalid lines, first at lines {parsed.invalid_lines}")
+
+        if not hash_values:
             raise HTTPException(
-                status_code=400, detail="No minions registered")
+                status_code=400, detail=f"No hashes found in file ({parsed.invalid} invalid lines)")
+        # reported with every response
+        upload = {"hashes": len(hash_values), "duplicates": parsed.duplicates,
+                  "invalid": parsed.invalid, "invalid_lines": parsed.invalid_lines}
 
-        # Save the uploaded file temporarily
-        temp_file = await save_temp_file(file)
-        fmt = FORMATTERS[FORMATTER_TASK_NAME]
-        numeric_slices = split_range(
-            fmt.min_value, fmt.max_value, len(minions))
-
-        # Process hashes and create tasks
-        for hash_value in get_hash_from_file(temp_file):
-            logger.info(f"master got hash: {hash_value}")
-            for idx, (start, end) in enumerate(numeric_slices):
-                task_id = f"{hash_value}_{idx}"
-                tasks[task_id] = HashTask(
-                    hash_value=hash_value,
-                    start=start,
-                    end=end
-                )
-                logger.info(f"Created task {task_id}: {start}–{end}")
-
-        # clean up
-        temp_file.unlink()
-
-        return {"status": "success", "message": f"Processed {len(tasks)} hashes"}
+        job_id = uuid4().hex[:8]
+        results: Dict[str, str] = {}
+
+        # 1) Hashes cracked before cost nothing
+        results.update(verify_results(hash_algorithm, potfile.lookup_many(hash_values)))
+        remaining = [h for h in hash_values if h not in results]
+        logger.info(
+            f"Resolved {len(results)} of {len(hash_values)} hashes of job {job_id} from the potfile")
+
+        # 2) The index covers the whole keyspace: what it misses is not in the domain
+        if remaining and lookups and digest_index is not None:
+            found = digest_index.lookup_many(remaining)
+            logger.info(
+                f"Resolved {len(found)} of {len(remaining)} hashes of job {job_id} from the digest index")
+            potfile.add_many(found)
+            results.update(found)
+            job = Job(job_id=job_id, hash_values=remaining, status=JobStatus.COMPLETED,
+                      searched=[[fmt.min_value, fmt.max_value]], results=results,
+                      priority=priority, weight=weight, algorithm=algorithm)
+            tasks.add_job(job)
+            return {"status": "success", "job_id": job_id, "upload": upload, "message": f"Resolved {len(results)} of {len(hash_values)} hashes without brute force", "results": results}
+
+        # 3) Brute-force the rest; the rainbow table covers part of the keyspace
+        #    and is searched alongside, without holding up the upload
+        if remaining and not any(algorithm in minion_algorithms(data["capabilities"]) for data in minions.values()):
+            raise HTTPException(
+                status_code=400, detail=f"No minions registered that can brute-force {len(remaining)} {algorithm} hashes")
+
+        job = Job(job_id=job_id, hash_values=remaining, results=results,
+                  priority=priority, weight=weight, algorithm=algorithm)
+        if remaining:
+            job.remaining = [[fmt.min_value, fmt.max_value]]
+        else:
+            job.status = JobStatus.COMPLETED
+        preempted = tasks.add_job(job, capable_minions(algorithm))
+        if preempted:
+            logger.info(
+                f"Job {job_id} (priority {priority}) preempted {len(preempted)} tasks")
+
+        if remaining and lookups and rainbow_table is not None:
+            start_rainbow_stage(job_id, remaining)
+        await notify_work()
+
+        if not remaining:
+            return {"status": "success", "job_id": job_id, "upload": upload, "message": f"Resolved all {len(hash_values)} hashes without brute force", "results": results}
+        logger.info(
+            f"Created job {job_id}: {len(remaining)} {algorithm} hashes over {fmt.min_value}–{fmt.max_value}, priority {priority}, weight {weight}")
+        return {"status": "success", "job_id": job_id, "upload": upload, "message": f"Processed {len(hash_values)} hashes, brute-forcing {len(remaining)}", "results": results}
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -168,59 +438,71 @@ async def upload_hashes(file: UploadFile = File(...)) -> Dict[str, str]:
 @app.get("/get-task",
          response_model=GetTaskResponse,
          responses={204: {"description": "No tasks available"}})
-async def get_task(minion_id: str) -> Union[GetTaskResponse, Response]:
-    """Get a task for a minion to process."""
+async def get_task(minion_id: str,
+                   wait: float = Query(0, ge=0, description="Seconds to hold the request until work shows up"),
+                   ahead: bool = Query(False, description="Lease another unit while the current one runs")) -> Union[GetTaskResponse, Response]:
+    """Get a task for a minion to process.
+
+    With `wait`, the request is long-polled: it is answered as soon as work
+    is available, or with 204 once the wait (capped at LONG_POLL_TIMEOUT) is over.
+    """
     # 1) Validate minion
     if minion_id not in minions:
         raise HTTPException(status_code=404, detail="Minion not registered")
 
-    # 2) If this minion already has an ASSIGNED task, re-return it
-    for tid, task in tasks.items():
-        if task.assigned_to == minion_id and task.status == TaskStatus.ASSIGNED:
-            fmt = FORMATTERS[FORMATTER_TASK_NAME]
-            return GetTaskResponse(
-                task_id=tid,
-                hash_value=task.hash_value,
-                start=task.start,
-                end=task.end,
-                start_str=fmt.number_to_string(task.start),
-                end_str=fmt.number_to_string(task.end),
-            )
-
-    # 3) Otherwise, grab the next PENDING task
-    for tid, task in tasks.items():
-        if task.status == TaskStatus.PENDING:
-            task.status = TaskStatus.ASSIGNED
-            task.assigned_to = minion_id
-            fmt = FORMATTERS[FORMATTER_TASK_NAME]
-            return GetTaskResponse(
-                task_id=tid,
-                hash_value=task.hash_value,
-                start=task.start,
-                end=task.end,
-                start_str=fmt.number_to_string(task.start),
-                end_str=fmt.number_to_string(task.end),
-            )
-
-    return Response(status_code=204)
+    deadline = asyncio.get_running_loop().time() + min(wait, LONG_POLL_TIMEOUT)
+    while True:
+        # 2) If this minion already has an ASSIGNED task, re-return it (unless
+        # it prefetches the next one), 3) otherwise carve the next unit out of
+        # the job whose turn it is, sized to a few seconds of work at the
+        # minion's last reported hashrate for its algorithm, or duplicate a
+        # straggler once no keyspace is left to hand out, among the jobs of
+        # algorithms the minion can crack
+        sizes = unit_sizes(minion_id)
+        if ahead:
+            assignment = None
+            if tasks.assigned_count(minion_id) < MAX_UNITS_PER_MINION:
+                assignment = tasks.assign_next(minion_id, sizes)
+        else:
+            assignment = tasks.assigned_to(
+                minion_id) or tasks.assign_next(minion_id, sizes)
+        if assignment is not None:
+            break
+        if not await wait_for_work(deadline):
+            return Response(status_code=204)
+
+    # a task handed out again resumes from its last checkpoint
+    tid, task = assignment
+    fmt = FORMATTERS[FORMATTER_TASK_NAME]
+    job = tasks.jobs[task.job_id]
+    return GetTaskResponse(
+        task_id=tid,
+        hash_values=job.hash_values,
+        start=task.resume_from,
+        end=task.end,
+        start_str=fmt.number_to_string(task.resume_from),
+        end_str=fmt.number_to_string(task.end),
+        algorithm=job.algorithm,
+    )
 
 
 @app.get("/task-status")
 async def task_status(task_id: str = Query(..., description="ID of the task to check")) -> Dict[str, str]:
     """
-    Return the current status of a given task_id.
+    Return the current status of a given task_id, renewing its lease.
     """
     task = tasks.get(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    tasks.renew(task_id)
     return {"task_id": task_id, "status": task.status.value}
 
 
 @app.get("/all-tasks")
 async def all_tasks() -> Dict[str, Dict[str, Any]]:
     """
-    Return the full in-memory tasks dict, keyed by task_id.
-    Each value includes hash_value, start/end, status, assigned_to, result.
+    Return every task (work unit) ever handed out, keyed by task_id.
+    Each value includes job_id, start/end, status, assigned_to, results.
     """
     # Convert each HashTask into a plain dict for JSON serialization
     return {
@@ -231,6 +513,30 @@ async def all_tasks() -> Dict[str, Dict[str, Any]]:
     }
 
 
+@app.post("/checkpoint")
+async def checkpoint(req: CheckpointRequest) -> Dict[str, str]:
+    """Commit a minion's progress on a task.
+
+    Requeued or re-fetched tasks resume from the last checkpoint. Returns the
+    task status, like /task-status, so the minion knows whether to go on.
+    """
+    if req.minion_id not in minions:
+        raise HTTPException(404, "Minion not registered")
+    task = tasks.get(req.task_id)
+    if not task:
+        raise HTTPException(404, "Task not found")
+    if task.assigned_to != req.minion_id:
+        raise HTTPException(400, "Task not assigned to this minion")
+
+    record_hashrate(req.minion_id, req.algorithm, req.hashrate)
+    potfile.add_many(req.results)
+    job = tasks.checkpoint(req.task_id, req.offset, req.results)
+    if job is not None and job.status == JobStatus.COMPLETED:
+        logger.info(
+            f"Job {job.job_id} completed: {len(job.results)} hashes cracked")
+    return {"task_id": req.task_id, "status": tasks.get(req.task_id).status.value}
+
+
 @app.post("/submit-result")
 async def submit_result(req: SubmitResultRequest) -> Dict[str, Any]:
     """Submit a result from a minion."""
@@ -245,33 +551,136 @@ async def submit_result(req: SubmitResultRequest) -> Dict[str, Any]:
     if task.assigned_to != req.minion_id:
         raise HTTPException(400, "Task not assigned to this minion")
 
+    record_hashrate(req.minion_id, req.algorithm, req.hashrate)
+
     # 3) Update this task
-    if req.result:
+    record_result(req.minion_id, req.task_id, task, req.results)
+    return {"status": "success", "task_id": req.task_id, "new_status": tasks.get(req.task_id).status.value}
+
+
+def record_result(minion_id: str, task_id: str, task: HashTask, results: Dict[str, str]) -> None:
+    """Complete a task: its whole range has been searched. The job completes
+    once every target is cracked or its keyspace is exhausted."""
+    for hash_value, password in results.items():
         logger.info(
-            f"Found password result: {req.result} for task {req.task_id} from {req.minion_id}")
-        task.status = TaskStatus.COMPLETED
-        task.result = req.result
-        # 4) Cancel all other slices for the same hash
-        hash_val = task.hash_value
-        for other_id, other in tasks.items():
-            if (other.hash_value == hash_val) and (other_id != req.task_id):
-                if other.status in (TaskStatus.PENDING, TaskStatus.ASSIGNED):
-                    other.status = TaskStatus.CANCELLED
-    else:
-        # no result found in this slice
-        task.status = TaskStatus.CANCELLED
+            f"Found password result: {password} for hash {hash_value} in task {task_id} from {minion_id}")
+    potfile.add_many(results)
+    was_running = task.status == TaskStatus.ASSIGNED
+    job = tasks.complete(task_id, results)
+    if was_running and job.status == JobStatus.COMPLETED:
+        logger.info(
+            f"Job {job.job_id} completed: {len(job.results)} hashes cracked")
 
-    return {"status": "success", "task_id": req.task_id, "new_status": task.status.value}
+
+@app.post("/tasks/batch", response_model=BatchResponse)
+async def tasks_batch(req: BatchRequest) -> BatchResponse:
+    """Return finished units and top the minion up to `hold` units, in one call.
+
+    Results of tasks the minion does not own are skipped. The response lists
+    every unit the minion holds (so a restarted minion gets its units back);
+    if that is none, the request is long-polled for up to `wait` seconds.
+    Targets are not included: fetch them once per job from /jobs/{job_id}/targets.
+    """
+    if req.minion_id not in minions:
+        raise HTTPException(404, "Minion not registered")
+    record_hashrate(req.minion_id, req.algorithm, req.hashrate)
+
+    for result in req.results:
+        task = tasks.get(result.task_id)
+        if task is None or task.assigned_to != req.minion_id:
+            logger.warning(
+                f"Skipping result of task {result.task_id} not assigned to {req.minion_id}")
+            continue
+        record_result(req.minion_id, result.task_id, task, result.results)
+
+    hold = max(0, min(req.hold, MAX_UNITS_PER_MINION))
+    deadline = asyncio.get_running_loop().time() + min(req.wait, LONG_POLL_TIMEOUT)
+    while True:
+        sizes = unit_sizes(req.minion_id)
+        while tasks.assigned_count(req.minion_id) < hold:
+            if tasks.assign_next(req.minion_id, sizes) is None:
+                break
+        held = tasks.assigned_tasks(req.minion_id)
+        if held or not await wait_for_work(deadline):
+            break
+
+    return BatchResponse(units=[
+        WorkUnit(task_id=task_id, job_id=task.job_id,
+                 start=task.resume_from, end=task.end,
+                 algorithm=tasks.jobs[task.job_id].algorithm)
+        for task_id, task in held
+    ])
 
 
 @app.get("/status")
 async def get_status() -> Dict[str, Dict[str, Any]]:
-    """Get the current status of all tasks and minions."""
+    """Get the current status of all jobs, outstanding tasks and minions."""
     return {
         "minions": minions,
-        "tasks": {k: v.model_dump() for k, v in tasks.items()}
+        "jobs": {summary.job_id: job_summary(summary) for summary in tasks.iter_job_summaries()},
+        "tasks": {k: v.model_dump() for k, v in tasks.tasks.items()}
     }
 
+
+@app.get("/jobs/{job_id}/targets",
+         response_class=Response,
+         responses={200: {"content": {"application/octet-stream": {}}}})
+async def job_targets(job_id: str, request: Request) -> Response:
+    """The target hashes of a job as packed raw digests of the job's algorithm.
+
+    Targets of salted algorithms are each followed by their salt, as a
+    little-endian uint16 length and the salt bytes. Deflate-compressed when
+    the client accepts it and it makes them smaller.
+    """
+    job = tasks.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    algorithm = ALGORITHMS[job.algorithm]
+    if algorithm.salted:
+        records = []
+        for target in job.hash_values:
+            digest, salt = algorithm.parse_target(target)
+            records.append(digest + struct.pack("<H", len(salt)) + salt)
+        packed = b"".join(records)
+    else:
+        packed = b"".join(bytes.fromhex(h) for h in job.hash_values)
+    if "deflate" in request.headers.get("accept-encoding", ""):
+        compressed = zlib.compress(packed)
+        # digests are close to random, so this only pays off for repetitive sets
+        if len(compressed) < len(packed):
+            return Response(compressed, media_type="application/octet-stream",
+                            headers={"Content-Encoding": "deflate"})
+    return Response(packed, media_type="application/octet-stream")
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """Progress and results of a job."""
+    job = tasks.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {**job_summary(job.summary()), "results": job.results}
+
+
+@app.post("/jobs/{job_id}/priority")
+async def set_job_priority(job_id: str,
+                           priority: int = Query(..., description="New priority of the job"),
+                           weight: Optional[float] = Query(None, gt=0, description="New weight; unchanged if omitted")) -> Dict[str, Any]:
+    """Reschedule a running job; raising its priority preempts lower-priority tasks."""
+    job = tasks.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Running job not found")
+    preempted = tasks.set_priority(
+        job_id, priority, job.weight if weight is None else weight, capable_minions(job.algorithm))
+    logger.info(
+        f"Job {job_id} rescheduled to priority {job.priority}, weight {job.weight}; preempted {len(preempted)} tasks")
+    await notify_work()
+    return job_summary(job.summary())
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host=MASTER_SERVER_HOST,
-                log_level=args.log_level, port=MASTER_SERVER_PORT)
+    # keep idle minion connections open long enough to be reused
+    MasterServer(uvicorn.Config(app, host=MASTER_SERVER_HOST,
+                                log_level=args.log_level, port=MASTER_SERVER_PORT,
+                                timeout_keep_alive=HTTP_KEEPALIVE,
+                                timeout_graceful_shutdown=SHUTDOWN_TIMEOUT)).run()
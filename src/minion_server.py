@@ -3,7 +3,7 @@ Minion server for the password cracker.
 """
 
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, Dict
+from typing import Any, AsyncIterator, Dict
 
 import asyncio
 import httpx
@@ -11,8 +11,15 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 
-from config import MINION_SERVER_LOGGER, parse_args, setup_logger, MASTER_SERVER_URL
-from utils.minion_utils import process_task_response
+from algorithms import ALGORITHMS
+from config import CRACK_CHUNK_SIZE, FORMATTER_TASK_NAME, HTTP_KEEPALIVE, LONG_POLL_TIMEOUT, MASTER_HTTP2, MINION_SERVER_LOGGER, parse_args, setup_logger, MASTER_SERVER_URL
+from engines import ENGINES
+from formatters import FORMATTERS
+from models.schemas.request import UnitResult
+from models.schemas.response import WorkUnit
+from utils.master_client import master_client, start_master_client, stop_master_client
+from utils.minion_utils import crack_range, forget_cancellations, hashrates, job_targets, listen_for_cancellations, record_hashrate, sync_tasks
+from utils.worker_utils import measure_hashrate, start_worker_pool, stop_worker_pool
 
 args = parse_args("Password Cracker Minion Server")
 
@@ -23,7 +30,12 @@ logger = setup_logger(
 MINION_ID = f"minion-{args.port}"
 MINION_HOST = args.host if args.host else "localhost"
 MINION_PORT = args.port
-MINION_CAPABILITIES = ["md5_crack"]  # Add more capabilities as needed
+MINION_WORKERS = args.workers
+MINION_ENGINE = args.engine
+MINION_PREFETCH = args.prefetch
+MINION_BATCH = args.batch
+# the master only routes jobs of these algorithms to this minion
+MINION_CAPABILITIES = [f"{name}_crack" for name in ALGORITHMS]
 REQUEST_TIMEOUT = 10
 HEARTBEAT_INTERVAL = 5
 FETCH_TASKS_INTERVAL = 5
@@ -35,20 +47,20 @@ async def register_to_master() -> bool:
     """Register this minion with the master server."""
     global is_registered
     try:
-        async with httpx.AsyncClient() as client:
-            req = {"minion_id": MINION_ID, "host": MINION_HOST,
-                   "port": MINION_PORT, "capabilities": MINION_CAPABILITIES}
-            logger.debug(f"register_to_master request details: {req}")
-
-            response = await client.post(f"{MASTER_SERVER_URL}/register", json={**req}, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-
-            if response.status_code == 200:
-                is_registered = True
-                logger.info(
-                    f"Successfully registered with master server as {MINION_ID}")
-                return True
-            return False
+        req = {"minion_id": MINION_ID, "host": MINION_HOST,
+               "port": MINION_PORT, "capabilities": MINION_CAPABILITIES,
+               "hashrates": hashrates()}
+        logger.debug(f"register_to_master request details: {req}")
+
+        response = await master_client().post("/register", json={**req})
+        response.raise_for_status()
+
+        if response.status_code == 200:
+            is_registered = True
+            logger.info(
+                f"Successfully registered with master server as {MINION_ID}")
+            return True
+        return False
     except Exception as e:
         is_registered = False
         logger.error(f"Failed to register with master server: {str(e)}")
@@ -62,15 +74,12 @@ async def send_heartbeat() -> None:
             if is_registered:
                 logger.info(
                     f"Sending heartbeat to master at {MASTER_SERVER_URL} from minion {MINION_ID}")
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        f"{MASTER_SERVER_URL}/minions/{MINION_ID}/heartbeat",
-                        timeout=REQUEST_TIMEOUT
-                    )
-                    if response.status_code != 200:
-                        logger.warning(
-                            f"Heartbeat failed: {response.status_code}")
-                        await register_to_master()
+                response = await master_client().post(
+                    f"/minions/{MINION_ID}/heartbeat")
+                if response.status_code != 200:
+                    logger.warning(
+                        f"Heartbeat failed: {response.status_code}")
+                    await register_to_master()
             else:
                 await register_to_master()
         except Exception as e:
@@ -81,52 +90,96 @@ async def send_heartbeat() -> None:
 
 async def disconnect_from_master() -> None:
     """Disconnect from the master server."""
-    async with httpx.AsyncClient() as client:
-        await client.post(f"{MASTER_SERVER_URL}/disconnect-minion", json={"minion_id": MINION_ID})
-        logger.info(f"Disconnected from master server as minion {MINION_ID}")
+    try:
+        await master_client().post("/disconnect-minion", json={"minion_id": MINION_ID})
+    except httpx.RequestError as e:
+        logger.warning(f"Could not disconnect from master server: {e!r}")
+        return
+    logger.info(f"Disconnected from master server as minion {MINION_ID}")
 
 
 async def fetch_task_from_master(minion_id: str, minion_registered: bool, poll_interval: float = 5.0) -> None:
-    """Fetch tasks from the master server."""
-    async with httpx.AsyncClient() as client:
-        logger.info(f"Fetching tasks loop for minion {minion_id}")
-        while minion_registered:
-            try:
-                try:
-                    resp = await client.get(
-                        f"{MASTER_SERVER_URL}/get-task",
-                        params={"minion_id": minion_id},
-                    )
-                except httpx.RequestError:
-                    logger.warning("Cannot reach master; stopping fetch loop.")
-                    await asyncio.sleep(poll_interval)
+    """Fetch tasks from the master server and search them.
+
+    Finished units are returned and new ones leased in one /tasks/batch call,
+    long-polled when the minion runs out of work; the loop only sleeps
+    `poll_interval` after errors. The minion holds --batch units, plus one
+    with --prefetch that is kept in reserve so the next unit is always ready.
+    Units with hits are returned right away.
+    """
+    reserve = 1 if MINION_PREFETCH else 0
+    hold = MINION_BATCH + reserve
+    logger.info(f"Fetching tasks loop for minion {minion_id}")
+    finished: list[UnitResult] = []
+    queue: list[WorkUnit] = []
+    while minion_registered:
+        try:
+            # hits are returned at once: they may complete a job and free
+            # every unit still queued for it
+            if len(queue) <= reserve or any(r.results for r in finished):
+                queue = await sync_tasks(minion_id, finished, hold,
+                                         wait=0 if queue else LONG_POLL_TIMEOUT)
+                finished = []
+                # units cancelled while queued are no longer listed
+                forget_cancellations([unit.task_id for unit in queue])
+                if not queue:
                     continue
 
-                if not await process_task_response(resp, minion_id):
-                    await asyncio.sleep(poll_interval)
-
-            except Exception as e:
-                logger.error("Error fetching task:", exc_info=e)
-                await asyncio.sleep(poll_interval)
-                continue
+            unit = queue.pop(0)
+            groups = await job_targets(unit.job_id, unit.algorithm)
+            found = await crack_range(minion_id, unit.task_id, unit.job_id, unit.algorithm, groups,
+                                      unit.start, unit.end)
+            if found is not None:
+                finished.append(UnitResult(
+                    task_id=unit.task_id, results=found))
+
+        except httpx.RequestError:
+            logger.warning("Cannot reach master; retrying.")
+            await asyncio.sleep(poll_interval)
+        except Exception as e:
+            logger.error("Error fetching task:", exc_info=e)
+            await asyncio.sleep(poll_interval)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Lifespan events for the application."""
     # Startup
-    logger.info(f"Minion {MINION_ID} is starting")
+    if MINION_ENGINE not in ENGINES:
+        raise ValueError(
+            f"Unknown engine {MINION_ENGINE}, choose one of: {', '.join(ENGINES)}")
+    # make sure the engine agrees with every algorithm before taking any work
+    for algorithm in ALGORITHMS.values():
+        ENGINES[MINION_ENGINE].self_check(FORMATTERS[FORMATTER_TASK_NAME], algorithm=algorithm)
+    logger.info(
+        f"Minion {MINION_ID} is starting with {MINION_WORKERS} worker processes using the {MINION_ENGINE} engine")
+    start_worker_pool(MINION_WORKERS, MINION_ENGINE)
+    # one pooled client for all traffic to the master, expiring idle
+    # connections before the master drops them
+    start_master_client(MASTER_SERVER_URL, REQUEST_TIMEOUT,
+                        HTTP_KEEPALIVE - HEARTBEAT_INTERVAL, http2=MASTER_HTTP2)
+    # the master sizes work units of each algorithm from its rate, refreshed
+    # after every task; a shorter sample per algorithm keeps start-up quick
+    for algorithm in ALGORITHMS:
+        record_hashrate(algorithm, await measure_hashrate(
+            FORMATTERS[FORMATTER_TASK_NAME], CRACK_CHUNK_SIZE // 5, algorithm))
+        logger.info(f"Minion {MINION_ID} measured {hashrates()[algorithm]:,.0f} {algorithm} hashes/s")
     is_registered = await register_to_master()
     if is_registered:
         task_heartbeat = asyncio.create_task(send_heartbeat())
+        task_events = asyncio.create_task(listen_for_cancellations(MINION_ID))
         task_fetch_tasks = asyncio.create_task(
             fetch_task_from_master(MINION_ID, is_registered, FETCH_TASKS_INTERVAL))
     yield
     # Shutdown
     if is_registered:
         task_heartbeat.cancel()
+        task_events.cancel()
         task_fetch_tasks.cancel()
+    stop_worker_pool()
     await disconnect_from_master()
+    logger.info(f"Master connection metrics: {master_client().metrics()}")
+    await stop_master_client()
     logger.info("Shutting down minion server")
 
 
@@ -146,6 +199,12 @@ async def health() -> Dict[str, str]:
     return {"status": "active"}
 
 
+@app.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    """Counters of the connection to the master, such as connection reuse."""
+    return {"master_client": master_client().metrics()}
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host=MINION_HOST, port=MINION_PORT,
                 log_level=args.log_level)
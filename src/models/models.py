@@ -2,7 +2,7 @@
 Models for the master server.
 """
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -22,18 +22,97 @@ class TaskStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+class JobStatus(str, Enum):
+    """Status of a job.
+
+    RUNNING:    Part of the keyspace is still to be searched.
+    COMPLETED:  Every target is cracked or the whole keyspace was searched.
+    CANCELLED:  The job is cancelled.
+    """
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class Job(BaseModel):
+    """A set of hashes searched over the keyspace of the configured format.
+
+    Work units are carved out of `remaining` only when a minion asks for
+    work, so a job costs O(outstanding units) regardless of the keyspace
+    size or the number of minions.
+
+    job_id:       The ID of the job.
+    hash_values:  The hash values to brute-force.
+    status:       The status of the job.
+    remaining:    [start, end] intervals not handed out yet, in order.
+    searched:     [start, end] intervals already searched, merged.
+    results:      The cracked hashes mapped to their passwords.
+    units_issued: The number of work units carved so far.
+    priority:     Jobs of a higher priority get every new work unit first,
+                  and take over the units of lower-priority jobs.
+    weight:       The share of work units among jobs of the same priority.
+    algorithm:    The name of the hash algorithm of the targets.
+    """
+    job_id: str
+    hash_values: List[str]
+    status: JobStatus = JobStatus.RUNNING
+    remaining: List[List[int]] = []
+    searched: List[List[int]] = []
+    results: Dict[str, str] = {}
+    units_issued: int = 0
+    priority: int = 0
+    weight: float = 1.0
+    algorithm: str = "md5"
+
+    def summary(self) -> "JobSummary":
+        """The progress of this job, without its hashes and results."""
+        return JobSummary(job_id=self.job_id, status=self.status, algorithm=self.algorithm,
+                          priority=self.priority, weight=self.weight, hashes=len(self.hash_values),
+                          cracked=len(self.results), searched=self.searched)
+
+
+class JobSummary(BaseModel):
+    """The progress of a job, read without loading its hashes and results.
+
+    job_id:    The ID of the job.
+    status:    The status of the job.
+    algorithm: The name of the hash algorithm of the targets.
+    priority:  The priority of the job.
+    weight:    The weight of the job among jobs of the same priority.
+    hashes:    The number of target hashes.
+    cracked:   The number of hashes cracked so far.
+    searched:  [start, end] intervals already searched, merged.
+    """
+    job_id: str
+    status: JobStatus
+    algorithm: str
+    priority: int
+    weight: float
+    hashes: int
+    cracked: int
+    searched: List[List[int]]
+
+
 class HashTask(BaseModel):
-    """Hash task request.
+    """Hash task request: a work unit carved out of a job.
 
-    hash_value: The hash value to crack.
-    start:      The start of the range to crack.
-    end:        The end of the range to crack.
-    status:     The status of the task.
+    job_id:      The ID of the job this unit belongs to.
+    start:       The start of the range to crack.
+    end:         The end of the range to crack.
+    status:      The status of the task.
     assigned_to: The ID of the minion assigned to the task.
+    results:     The hashes cracked in this range, mapped to their passwords.
+    checkpoint:  The next number to search, as last committed by the minion.
     """
-    hash_value: str
+    job_id: str
     start: int
     end: int
     status: TaskStatus = TaskStatus.PENDING
     assigned_to: Optional[str] = None
-    result: Optional[str] = None
+    results: Dict[str, str] = {}
+    checkpoint: Optional[int] = None
+
+    @property
+    def resume_from(self) -> int:
+        """Where searching this range resumes: the checkpoint, or the start."""
+        return self.start if self.checkpoint is None else self.checkpoint
@@ -1,9 +1,11 @@
 
 """Schemas for API requests."""
 
-from typing import List
+from typing import Dict, List
 from pydantic import BaseModel
 
+from algorithms import DEFAULT_ALGORITHM
+
 
 class MinionRegistrationRequest(BaseModel):
     """Minion registration request.
@@ -12,11 +14,13 @@ class MinionRegistrationRequest(BaseModel):
     host:      The host of the minion.
     port:      The port of the minion.
     capabilities: The capabilities of the minion.
+    hashrates: The measured hashes per second of the minion, by algorithm.
     """
     minion_id: str
     host: str
     port: int
     capabilities: List[str]
+    hashrates: Dict[str, float] = {}
 
 
 class SubmitResultRequest(BaseModel):
@@ -24,11 +28,61 @@ class SubmitResultRequest(BaseModel):
 
     minion_id: The ID of the minion submitting the result.
     task_id:   The ID of the task being submitted.
-    result:    The discovered password (empty string if none).
+    results:   The cracked hashes mapped to their passwords (empty if none).
+    hashrate:  The hashes per second measured over the task (0 if unknown).
+    algorithm: The hash algorithm `hashrate` was measured with.
     """
     minion_id: str
     task_id:   str
-    result:    str  # the discovered password (empty string if none)
+    results:   Dict[str, str]  # hash -> discovered password (empty if none)
+    hashrate:  float = 0.0
+    algorithm: str = DEFAULT_ALGORITHM
+
+
+class CheckpointRequest(BaseModel):
+    """Checkpoint request.
+
+    minion_id: The ID of the minion reporting progress.
+    task_id:   The ID of the task in progress.
+    offset:    Every number of the task before this one has been searched.
+    results:   The hashes cracked so far, mapped to their passwords.
+    hashrate:  The hashes per second measured over the task so far (0 if unknown).
+    algorithm: The hash algorithm `hashrate` was measured with.
+    """
+    minion_id: str
+    task_id:   str
+    offset:    int
+    results:   Dict[str, str]
+    hashrate:  float = 0.0
+    algorithm: str = DEFAULT_ALGORITHM
+
+
+class UnitResult(BaseModel):
+    """Result of a work unit, as part of a batch.
+
+    task_id:   The ID of the task searched.
+    results:   The cracked hashes mapped to their passwords (empty if none).
+    """
+    task_id:   str
+    results:   Dict[str, str]
+
+
+class BatchRequest(BaseModel):
+    """Batch request: return finished units and get new ones in one call.
+
+    minion_id: The ID of the minion.
+    results:   The results of the units searched since the last call.
+    hashrate:  The hashes per second measured over the last task (0 if unknown).
+    algorithm: The hash algorithm `hashrate` was measured with.
+    hold:      How many units the minion wants to hold after this call.
+    wait:      Seconds to hold the request if the minion would be left without work.
+    """
+    minion_id: str
+    results:   List[UnitResult] = []
+    hashrate:  float = 0.0
+    algorithm: str = DEFAULT_ALGORITHM
+    hold:      int = 1
+    wait:      float = 0.0
 
 
 class DisconnectRequest(BaseModel):
@@ -1,22 +1,53 @@
 
 """Schemas for API responses."""
 
+from typing import List
+
 from pydantic import BaseModel
 
 
 class GetTaskResponse(BaseModel):
     """Get task response.
 
-    task_id:    The ID of the task.
-    hash_value: The hash value to crack.
-    start:      The start of the range to crack.
-    end:        The end of the range to crack.
-    start_str:  The start of the range to crack in string format.
-    end_str:    The end of the range to crack in string format.
+    task_id:     The ID of the task.
+    hash_values: The hash values to crack.
+    start:       The start of the range to crack.
+    end:         The end of the range to crack.
+    start_str:   The start of the range to crack in string format.
+    end_str:     The end of the range to crack in string format.
+    algorithm:   The hash algorithm of the targets.
+    """
+    task_id:     str
+    hash_values: List[str]
+    start:       int
+    end:         int
+    start_str:   str
+    end_str:     str
+    algorithm:   str = "md5"
+
+
+class WorkUnit(BaseModel):
+    """A work unit in a batch response.
+
+    The job's targets are fetched once from /jobs/{job_id}/targets as packed
+    raw digests (and salts), so units do not carry them.
+
+    task_id:     The ID of the task.
+    job_id:      The ID of the job the unit belongs to.
+    start:       The start of the range to crack (its checkpoint, if any).
+    end:         The end of the range to crack.
+    algorithm:   The hash algorithm of the job's targets.
+    """
+    task_id:     str
+    job_id:      str
+    start:       int
+    end:         int
+    algorithm:   str = "md5"
+
+
+class BatchResponse(BaseModel):
+    """Batch response.
+
+    units:       Every unit the minion holds, oldest first.
     """
-    task_id:    str
-    hash_value: str
-    start:      int
-    end:        int
-    start_str:  str
-    end_str:    str
+    units:       List[WorkUnit]
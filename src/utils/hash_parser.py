@@ -0,0 +1,100 @@
+"""
+Parsing of hash files, shared by the master's uploads and the crack CLI.
+"""
+
+import binascii
+from binascii import unhexlify
+from typing import BinaryIO, Hashable, NamedTuple, Optional
+
+from algorithms import ALGORITHMS, DEFAULT_ALGORITHM, HashAlgorithm
+from config import MAX_REPORTED_INVALID_LINES, UPLOAD_CHUNK_SIZE
+
+
+class ParsedHashes(NamedTuple):
+    """Hashes parsed from a hash file.
+
+    hash_values:   The unique valid targets (lowercase hex digest, then
+                   ":salt" if salted), in upload order.
+    lines:         The number of lines read.
+    duplicates:    Valid lines repeating an earlier target.
+    invalid:       Lines that are not a valid target of the algorithm.
+    invalid_lines: Line numbers of the first invalid lines.
+    """
+    hash_values: list[str]
+    lines: int
+    duplicates: int
+    invalid: int
+    invalid_lines: list[int]
+
+
+def _unhexlify_lines(lines: bytes, count: int, digest_size: int = 16) -> Optional[bytes]:
+    """Decode `count` lines that are all exactly one hex digest, or return None.
+
+    Checks the line breaks by position, so clean files are decoded at C speed
+    in one call.
+    """
+    width = 2 * digest_size
+    for newline, stride in ((b"\n", width + 1), (b"\r\n", width + 2)):
+        if len(lines) == stride * count and lines[stride - 1::stride] == b"\n" * count \
+                and (stride == width + 1 or lines[stride - 2::stride] == b"\r" * count):
+            try:
+                return unhexlify(lines.replace(newline, b""))
+            except binascii.Error:
+                return None
+    return None
+
+
+def parse_hashes(stream: BinaryIO, chunk_size: int = UPLOAD_CHUNK_SIZE,
+                 algorithm: HashAlgorithm = ALGORITHMS[DEFAULT_ALGORITHM]) -> ParsedHashes:
+    """Parse hashes of `algorithm`, one per line, from a binary stream read in chunks.
+
+    Lines of salted algorithms are `hexdigest:salt`. Blank lines and `#`
+    comments are skipped, digits may be in any case, and duplicates are
+    dropped. Digests are kept as raw bytes while parsing, so memory grows
+    with the unique hashes only, not with the file.
+    """
+    size = algorithm.digest_size
+    digests: dict[Hashable, None] = {}
+    lines = duplicates = invalid = 0
+    invalid_lines: list[int] = []
+    tail = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        data = tail + chunk
+        # a trailing partial line may continue in the next chunk
+        cut = data.rfind(b"\n") + 1 if chunk else len(data)
+        complete, tail = data[:cut], data[cut:]
+        count = complete.count(b"\n")
+        raw = _unhexlify_lines(complete, count, size) if chunk and not algorithm.salted else None
+        if raw is not None:
+            # fast path: every line of the chunk is a digest
+            before = len(digests)
+            digests.update(dict.fromkeys(
+                raw[i:i + size] for i in range(0, len(raw), size)))
+            duplicates += count - (len(digests) - before)
+            lines += count
+        else:
+            for line in complete.splitlines():
+                lines += 1
+                line = line.strip()
+                if not line or line.startswith(b"#"):
+                    continue
+                target = algorithm.parse_target(line.decode(errors="replace"))
+                if target is not None:
+                    key = target if algorithm.salted else target[0]
+                    if key in digests:
+                        duplicates += 1
+                    else:
+                        digests[key] = None
+                    continue
+                invalid += 1
+                if len(invalid_lines) < MAX_REPORTED_INVALID_LINES:
+                    invalid_lines.append(lines)
+        if not chunk:
+            break
+
+    if algorithm.salted:
+        hash_values = [algorithm.target(digest, salt) for digest, salt in digests]
+    else:
+        hash_values = [digest.hex() for digest in digests]
+    return ParsedHashes(hash_values, lines, duplicates, invalid, invalid_lines)
@@ -0,0 +1,60 @@
+"""
+Helpers for lists of inclusive [start, end] intervals.
+"""
+
+from bisect import bisect_left
+from typing import Optional
+
+
+def add_interval(intervals: list[list[int]], start: int, end: int) -> None:
+    """Insert [start..end] into a sorted interval list, merging overlaps and neighbours."""
+    i = bisect_left(intervals, [start, end])
+    # merge with the previous interval if it touches
+    if i > 0 and intervals[i - 1][1] >= start - 1:
+        i -= 1
+        start = intervals[i][0]
+        end = max(end, intervals[i][1])
+        del intervals[i]
+    # swallow every following interval that touches
+    while i < len(intervals) and intervals[i][0] <= end + 1:
+        end = max(end, intervals[i][1])
+        del intervals[i]
+    intervals.insert(i, [start, end])
+
+
+def take_interval(intervals: list[list[int]], size: int,
+                  ranking: Optional[list[tuple[int, int]]] = None) -> Optional[tuple[int, int]]:
+    """Carve up to `size` numbers off the front of the first interval.
+
+    With a `ranking` (ranges in the order they should be searched), carve
+    from the first of its ranges that still has numbers left instead.
+    """
+    if not intervals:
+        return None
+    if not ranking:
+        return _carve(intervals, 0, intervals[0][0], size)
+    for low, high in ranking:
+        # the first interval ending at or after `low`
+        i = bisect_left(intervals, [low + 1]) - 1
+        if i < 0 or intervals[i][1] < low:
+            i += 1
+        if i < len(intervals) and intervals[i][0] <= high:
+            start = max(low, intervals[i][0])
+            return _carve(intervals, i, start, min(size, high - start + 1))
+    # numbers outside the ranking are searched last
+    return _carve(intervals, 0, intervals[0][0], size)
+
+
+def _carve(intervals: list[list[int]], i: int, start: int, size: int) -> tuple[int, int]:
+    """Remove [start..start+size-1] (clipped to the interval) from interval `i`."""
+    low, high = intervals[i]
+    taken_end = min(high, start + size - 1)
+    rest = ([[low, start - 1]] if start > low else []) + \
+        ([[taken_end + 1, high]] if taken_end < high else [])
+    intervals[i:i + 1] = rest
+    return start, taken_end
+
+
+def interval_total(intervals: list[list[int]]) -> int:
+    """How many numbers the intervals cover."""
+    return sum(end - start + 1 for start, end in intervals)
@@ -0,0 +1,144 @@
+"""
+Pooled HTTP client for all minion-to-master traffic.
+
+One long-lived client keeps connections to the master alive between calls,
+instead of paying for a new TCP connection on every heartbeat, checkpoint or
+batch. Requests that fail before reaching the master (refused connections,
+keep-alive connections the master just closed) are retried with exponential
+backoff; every call the minion makes is safe to repeat. Connection reuse is
+counted through httpcore's trace hook and exposed by `metrics()`.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from logging import getLogger
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+
+from config import MINION_SERVER_LOGGER
+
+logger = getLogger(MINION_SERVER_LOGGER)
+
+# errors raised before the master could have processed the request
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout,
+                    httpx.RemoteProtocolError)
+
+
+class MasterClient:
+    """
+    A connection-pooled httpx client for one master, with retries and metrics.
+    """
+
+    def __init__(self, base_url: str, timeout: float, keepalive: float,
+                 retries: int = 3, backoff: float = 0.5, http2: bool = False) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10,
+                                keepalive_expiry=keepalive),
+            http2=http2,
+        )
+        self._retries = retries
+        self._backoff = backoff
+        self._started_at = time.monotonic()
+        self._requests = 0
+        self._connections = 0
+        self._retried = 0
+        self._failed = 0
+
+    async def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._connections += 1
+
+    async def _backoff_or_raise(self, attempt: int, error: Exception) -> None:
+        if attempt >= self._retries:
+            self._failed += 1
+            raise error
+        self._retried += 1
+        delay = self._backoff * 2 ** attempt
+        logger.debug(f"Retrying request to master in {delay:.1f}s: {error!r}")
+        await asyncio.sleep(delay)
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request, retrying errors raised before it reached the master."""
+        extensions = {**kwargs.pop("extensions", {}), "trace": self._trace}
+        attempt = 0
+        while True:
+            try:
+                resp = await self._client.request(method, url, extensions=extensions, **kwargs)
+                self._requests += 1
+                return resp
+            except RETRYABLE_ERRORS as e:
+                await self._backoff_or_raise(attempt, e)
+                attempt += 1
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """Stream a response; only opening it is retried."""
+        extensions = {**kwargs.pop("extensions", {}), "trace": self._trace}
+        attempt = 0
+        while True:
+            try:
+                async with self._client.stream(method, url, extensions=extensions, **kwargs) as resp:
+                    # once the body is being read, errors are the caller's
+                    self._requests += 1
+                    attempt = -1
+                    yield resp
+                return
+            except RETRYABLE_ERRORS as e:
+                if attempt < 0:
+                    raise
+                await self._backoff_or_raise(attempt, e)
+                attempt += 1
+
+    def metrics(self) -> dict[str, Any]:
+        """Request and connection counters since the client was created.
+
+        `requests` counts answered requests; those answered without opening
+        a connection reused a pooled one.
+        """
+        return {
+            "uptime_seconds": round(time.monotonic() - self._started_at, 1),
+            "requests": self._requests,
+            "connections_opened": self._connections,
+            "connections_reused": self._requests - self._connections,
+            "reuse_ratio": round(1 - self._connections / self._requests, 3) if self._requests else 0.0,
+            "retries": self._retried,
+            "failures": self._failed,
+        }
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_client: Optional[MasterClient] = None
+
+
+def start_master_client(base_url: str, timeout: float, keepalive: float, http2: bool = False) -> MasterClient:
+    """Create the shared client used for every call to the master."""
+    global _client
+    _client = MasterClient(base_url, timeout, keepalive, http2=http2)
+    return _client
+
+
+async def stop_master_client() -> None:
+    """Close the shared client and its connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def master_client() -> MasterClient:
+    """The shared client; `start_master_client` must have been called."""
+    if _client is None:
+        raise RuntimeError("Master client is not started")
+    return _client
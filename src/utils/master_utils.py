@@ -2,35 +2,33 @@
 Utility functions for the master server.
 """
 
-import json
-import os
+import asyncio
 from pathlib import Path
-from typing import Generator
+from typing import Optional
 from logging import getLogger
 
 from fastapi import HTTPException
 from fastapi import UploadFile
 
-from config import MASTER_SERVER_LOGGER
-from models.models import HashTask, TaskStatus
+from algorithms import HashAlgorithm
+from config import LEASE_SECONDS, LOOKUP_WORKERS, MASTER_SERVER_LOGGER, MIN_WORK_UNIT_SIZE, STRAGGLER_SECONDS, UPLOAD_CHUNK_SIZE, WORK_UNIT_SECONDS, WORK_UNIT_SIZE, index_file, priors_file, rainbow_file
+from formatters import FORMATTERS
+from lookup.digest_index import DigestIndex
+from lookup.potfile import Potfile
+from lookup.rainbow_table import RainbowTable
+from utils.hash_parser import ParsedHashes, parse_hashes
+from utils.task_db import TaskDB
+from utils.task_store import TaskStore
 
 logger = getLogger(MASTER_SERVER_LOGGER)
 
 
-def get_hash_from_file(file_path: Path) -> Generator[str, None, None]:
-    """Helper function to read hashes from a file and yield them."""
+async def read_uploaded_hashes(file: UploadFile, algorithm: HashAlgorithm) -> ParsedHashes:
+    """Parse an uploaded hash file in a worker thread.
 
-    with open(file_path, 'r') as f:
-        for line in f:
-            if line == "" or line.startswith("#"):
-                continue
-            hash_value = line.strip()
-            if hash_value:
-                yield hash_value
-
-
-async def save_temp_file(file: UploadFile) -> Path:
-    """Save a file to the temporary directory."""
+    The upload is streamed from the request body into a spooled temporary
+    file by the framework, so it is never held in memory as a whole.
+    """
     if not file.filename.endswith(".txt"):
         logger.error(
             f"File must be a text file. the current file is: {file.filename}")
@@ -39,74 +37,109 @@ async def save_temp_file(file: UploadFile) -> Path:
             detail=f"File must be a text file. the current file is: {file.filename}"
         )
 
-    temp_file = Path("temp_hashes.txt")
-    content = await file.read()
-    temp_file.write_bytes(content)
-    return temp_file
-
-
-def split_range(start: int, end: int, parts: int) -> list[tuple[int, int]]:
-    """
-    Divide [start..end] into `parts` contiguous slices.
-    Handles remainders so that early slices get one extra item when needed.
-    """
-    if start > end:
-        raise HTTPException(
-            status_code=500, detail="start must be less than end")
-    if parts <= 0:
-        raise HTTPException(
-            status_code=500, detail="parts must be greater than 0")
-
-    total = end - start + 1
-    base, rem = divmod(total, parts)
-
-    slices = []
-    current = start
-    for i in range(parts):
-        # give the first `rem` slices an extra element
-        inc = base + (1 if i < rem else 0)
-        s = current
-        e = current + inc - 1
-        slices.append((s, e))
-        current = e + 1
-
-    return slices
-
+    await file.seek(0)
+    return await asyncio.to_thread(parse_hashes, file.file, UPLOAD_CHUNK_SIZE, algorithm)
 
-def remove_assigned_tasks(tasks: dict[str, HashTask], minion_id: str) -> None:
-    """Remove minion's assigned tasks from the tasks dictionary."""
-    for _, task in tasks.items():
-        if task.status == TaskStatus.COMPLETED:
-            continue
 
-        if task.assigned_to == minion_id:
-            task.status = TaskStatus.PENDING
-            task.assigned_to = None
-            task.result = None
+def verify_results(algorithm: HashAlgorithm, results: dict[str, str]) -> dict[str, str]:
+    """The results whose password really hashes to their target under `algorithm`.
 
+    The potfile is shared by every algorithm and cannot tell them apart, so
+    its answers are checked before they are trusted.
+    """
+    return {target: password for target, password in results.items()
+            if algorithm.verify(target, password)}
 
-def load_tasks_from_file(file_path: Path) -> dict[str, HashTask]:
-    """Load tasks from a file."""
 
-    if not os.path.exists(file_path):
-        return {}
-    with open(file_path, "r", encoding="utf-8") as f:
-        # load as dict
-        tasks_dict = json.load(f)
+def minion_algorithms(capabilities: list[str]) -> set[str]:
+    """The hash algorithms a minion can crack, from its `<algorithm>_crack` capabilities."""
+    return {capability.removesuffix("_crack") for capability in capabilities
+            if capability.endswith("_crack")}
 
-    # convert to HashTask objects
-    tasks = {k: HashTask(**v) for k, v in tasks_dict.items()}
 
-    logger.info(f"Loading tasks from {file_path}")
-    return tasks
+def work_unit_size(hashrate: float) -> int:
+    """How many numbers a minion searches in about WORK_UNIT_SECONDS.
 
+    Minions that reported no hashrate get the fixed WORK_UNIT_SIZE.
+    """
+    if hashrate <= 0:
+        return WORK_UNIT_SIZE
+    return max(MIN_WORK_UNIT_SIZE, int(hashrate * WORK_UNIT_SECONDS))
 
-def save_tasks_to_file(file_path: Path, tasks: dict[str, HashTask]) -> None:
-    """Save tasks to a file."""
-    logger.info(f"Saving tasks to {file_path}")
 
-    # convert to dict
-    tasks_dict = {k: v.model_dump() for k, v in tasks.items()}
+def load_ranking(format_name: str) -> Optional[list[tuple[int, int]]]:
+    """Rank the keyspace of a formatter by its prefix priors, if it has any.
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(tasks_dict, f)
+    The priors file has one `prefix weight` pair per line, such as `052 3`;
+    blank lines and `#` comments are skipped.
+    """
+    path = priors_file(format_name)
+    if not path.exists():
+        logger.info(f"No priors for {format_name}, the keyspace is searched in order")
+        return None
+
+    priors: dict[str, float] = {}
+    try:
+        for number, line in enumerate(path.read_text().splitlines(), 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split()
+            if len(fields) != 2:
+                raise ValueError(f"line {number}: expected `prefix weight`")
+            priors[fields[0]] = float(fields[1])
+        ranking = FORMATTERS[format_name].ranked_ranges(priors)
+    except ValueError as e:
+        logger.warning(f"Ignoring priors {path}: {e}")
+        return None
+    logger.info(f"Loaded {len(priors)} priors from {path}, searching {len(ranking)} ranges by likelihood")
+    return ranking
+
+
+def load_task_store(file_path: Path, ranking: Optional[list[tuple[int, int]]] = None) -> TaskStore:
+    """Open the task database and load the jobs that are still running."""
+    store = TaskStore(TaskDB(file_path), LEASE_SECONDS, STRAGGLER_SECONDS, ranking)
+    logger.info(
+        f"Loaded {len(store.jobs)} running jobs with {len(store.tasks)} assigned tasks from {file_path}")
+    return store
+
+
+def load_digest_index(format_name: str) -> Optional[DigestIndex]:
+    """Open the digest index of a formatter, if one was built."""
+    path = index_file(format_name)
+    if not path.exists():
+        logger.info(
+            f"No digest index for {format_name}, hashes will be brute-forced")
+        return None
+
+    try:
+        index = DigestIndex(path, FORMATTERS[format_name])
+    except ValueError as e:
+        logger.warning(f"Ignoring digest index {path}: {e}")
+        return None
+    logger.info(f"Loaded digest index {path} ({index.count} records)")
+    return index
+
+
+def load_rainbow_table(format_name: str) -> Optional[RainbowTable]:
+    """Open the rainbow table of a formatter, if one was built."""
+    path = rainbow_file(format_name)
+    if not path.exists():
+        return None
+
+    try:
+        table = RainbowTable(path, FORMATTERS[format_name], LOOKUP_WORKERS)
+    except ValueError as e:
+        logger.warning(f"Ignoring rainbow table {path}: {e}")
+        return None
+    table.start_workers()
+    logger.info(
+        f"Loaded rainbow table {path} ({table.count} chains, success rate {table.success_rate:.1%})")
+    return table
+
+
+def load_potfile(file_path: Path) -> Potfile:
+    """Open the potfile of cracked hashes, creating it if needed."""
+    potfile = Potfile(file_path)
+    logger.info(f"Loaded {len(potfile)} cracked hashes from {file_path}")
+    return potfile
@@ -0,0 +1,57 @@
+"""
+Server-sent event channels from the master to its minions.
+
+Each minion keeps one `GET /minions/{minion_id}/events` stream open; the
+master pushes events (such as task cancellations) into it the moment they
+happen, so minions never poll for them. A comment line is sent when a stream
+is idle, so dead connections are noticed on both ends.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+
+class MinionEvents:
+    """
+    Per-minion queues of server-sent events.
+    """
+
+    def __init__(self, keepalive: float) -> None:
+        self._keepalive = keepalive
+        self._queues: dict[str, set[asyncio.Queue[str]]] = {}
+        self._closed = False
+
+    def publish(self, minion_id: str, event: str, data: str) -> None:
+        """Send an event to every open stream of a minion; dropped if there is none."""
+        message = f"event: {event}\ndata: {data}\n\n"
+        for queue in self._queues.get(minion_id, ()):
+            queue.put_nowait(message)
+
+    def close(self) -> None:
+        """End every open stream; streams opened afterwards end right away."""
+        self._closed = True
+        for queues in self._queues.values():
+            for queue in queues:
+                queue.put_nowait("")
+
+    async def stream(self, minion_id: str) -> AsyncIterator[str]:
+        """Yield the event stream of a minion until it disconnects or `close` is called."""
+        if self._closed:
+            return
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        self._queues.setdefault(minion_id, set()).add(queue)
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self._keepalive)
+                except asyncio.TimeoutError:
+                    message = ": keep-alive\n\n"
+                if not message:
+                    return
+                yield message
+        finally:
+            queues = self._queues[minion_id]
+            queues.discard(queue)
+            if not queues:
+                del self._queues[minion_id]
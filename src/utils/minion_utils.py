@@ -2,111 +2,275 @@
 """Minion utilities."""
 
 
-from hashlib import md5
-
+import asyncio
+import struct
+import time
 from logging import getLogger
+from typing import Collection, Optional
+
 import httpx
-from pydantic import ValidationError
 
-from config import CANCEL_CHECK_INTERVAL, FORMATTER_TASK_NAME, LOG_PROGRESS_INTERVAL, MASTER_SERVER_URL, MINION_SERVER_LOGGER
+from algorithms import ALGORITHMS, DEFAULT_ALGORITHM
+from config import CHECKPOINT_INTERVAL, CRACK_CHUNK_SIZE, EVENTS_KEEPALIVE, FORMATTER_TASK_NAME, LOG_PROGRESS_INTERVAL, MINION_SERVER_LOGGER
 from formatters import FORMATTERS
-from models.schemas.request import SubmitResultRequest
-from models.schemas.response import GetTaskResponse
+from models.schemas.request import BatchRequest, CheckpointRequest, UnitResult
+from models.schemas.response import BatchResponse, WorkUnit
+from utils.master_client import master_client
+from utils.worker_utils import chunk_range, in_flight_limit, publish_targets, retire_targets, submit_search
 
 logger = getLogger(MINION_SERVER_LOGGER)
 
+# hashes per second of each algorithm, measured at start-up and over the
+# last task of that algorithm, reported to the master
+_hashrates: dict[str, float] = {}
+_last_algorithm = DEFAULT_ALGORITHM
 
-async def should_continue(task_id: str) -> bool:
-    """
-    Ask the master if this task is still assigned.
-    Returns False if status is 'cancelled' or 'completed'.
+
+def hashrates() -> dict[str, float]:
+    """The last measured hashes per second of this minion, by algorithm."""
+    return dict(_hashrates)
+
+
+def current_hashrate() -> tuple[str, float]:
+    """The algorithm measured last and its hashes per second (0 if unknown)."""
+    return _last_algorithm, _hashrates.get(_last_algorithm, 0.0)
+
+
+def record_hashrate(algorithm: str, rate: float) -> None:
+    """Remember a measured hashrate, reported with the next registration or result."""
+    global _last_algorithm
+    _hashrates[algorithm] = rate
+    _last_algorithm = algorithm
+
+
+# set when the master pushes a cancellation, checked by crack_range between chunks
+_cancellations: dict[str, asyncio.Event] = {}
+
+
+def cancellation(task_id: str) -> asyncio.Event:
+    """The local cancellation flag of a task."""
+    return _cancellations.setdefault(task_id, asyncio.Event())
+
+
+def forget_cancellations(keep: Collection[str]) -> None:
+    """Drop the flags of every task but `keep`, the units the minion still holds.
+
+    crack_range drops the flag of the units it runs; this covers the units
+    dropped before they ran, and cancellations of units already finished.
     """
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{MASTER_SERVER_URL}/task-status",
-            params={"task_id": task_id},
-            timeout=5.0
-        )
+    for task_id in _cancellations.keys() - set(keep):
+        del _cancellations[task_id]
 
-    r.raise_for_status()
-    status = r.json()["status"]
-    return status == "assigned"
 
+async def listen_for_cancellations(minion_id: str, retry_interval: float = 5.0) -> None:
+    """Follow the master's event stream and flag the tasks it cancels.
 
-async def submit_result(minion_id: str, task_id: str, result: str) -> None:
-    """Submit a result to the master server."""
-    payload = SubmitResultRequest(
+    Reconnects after `retry_interval` if the stream breaks; the keep-alives of
+    the master make a silent connection time out.
+    """
+    timeout = httpx.Timeout(5.0, read=3 * EVENTS_KEEPALIVE)
+    while True:
+        try:
+            async with master_client().stream("GET", f"/minions/{minion_id}/events", timeout=timeout) as resp:
+                resp.raise_for_status()
+                logger.info(f"Listening for events of minion {minion_id}")
+                event = None
+                async for line in resp.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line.removeprefix("event:").strip()
+                    elif line.startswith("data:") and event == "cancel":
+                        task_id = line.removeprefix("data:").strip()
+                        logger.info(f"Master cancelled task {task_id}")
+                        cancellation(task_id).set()
+                    elif not line:
+                        event = None
+        except httpx.HTTPError as e:
+            logger.warning(f"Event stream from master lost: {e!r}")
+        await asyncio.sleep(retry_interval)
+
+
+async def submit_checkpoint(minion_id: str, task_id: str, offset: int, results: dict[str, str],
+                            algorithm: str, hashrate: float) -> bool:
+    """
+    Commit that every number of the task before `offset` was searched, with
+    the hashrate of `algorithm` measured so far.
+    Returns False once the task is no longer assigned.
+    """
+    payload = CheckpointRequest(
         minion_id=minion_id,
         task_id=task_id,
-        result=result
+        offset=offset,
+        results=results,
+        hashrate=hashrate,
+        algorithm=algorithm
     )
-    async with httpx.AsyncClient() as client:
-        await client.post(
-            f"{MASTER_SERVER_URL}/submit-result",
-            json=payload.model_dump()
-        )
+    r = await master_client().post("/checkpoint", json=payload.model_dump())
+    r.raise_for_status()
+    return r.json()["status"] == "assigned"
+
 
+async def crack_range(minion_id: str, task_id: str, job_id: str, algorithm: str,
+                      groups: dict[bytes, dict[bytes, str]], start: int, end: int) -> Optional[dict[str, str]]:
+    """Crack a range of numbers against a whole set of target hashes.
 
-async def crack_range(minion_id: str, task_id: str, hash_value: str, start: int, end: int) -> None:
-    """Crack a range of numbers."""
+    The range is cut into chunks that are searched by the worker pool, so the
+    event loop stays responsive. Each candidate is hashed once per salt and
+    looked up by raw digest, so the cost grows with the number of distinct
+    salts, not with the number of targets.
+    Every hit in the range is reported; the search only stops early once all
+    targets are found. Every CHECKPOINT_INTERVAL seconds the searched prefix
+    of the range is committed to the master, so the task can resume there.
+    Cancellations pushed by the master stop the search right away.
+
+    `groups` maps each salt to its targets, raw digests mapped to their
+    target strings (see `job_targets`, which also publishes them to the
+    workers under the job id). Returns the hits, or None if the task was
+    cancelled.
+    """
 
     fmt = FORMATTERS[FORMATTER_TASK_NAME]
     total = end - start + 1
+    targets = sum(len(group) for group in groups.values())
     tried = 0
+    found: dict[str, str] = {}
 
     logger.info(
-        f"[{task_id}] - Starting crack: hash={hash_value},range={fmt.number_to_string(start)}-{fmt.number_to_string(end)}")
-
-    for candidate in range(start, end + 1):
-        tried += 1
-        phone_str = fmt.number_to_string(candidate)
+        f"[{task_id}] - Starting crack: algorithm={algorithm},hashes={targets},salts={len(groups)},range={fmt.number_to_string(start)}-{fmt.number_to_string(end)}")
 
-        if tried % LOG_PROGRESS_INTERVAL == 0:
-            pct = (tried / total) * 100
-            logger.info(
-                f"[{task_id}] - Progress: ({pct:.1f}%) current={phone_str}")
+    chunks = chunk_range(start, end, CRACK_CHUNK_SIZE)
+    in_flight: dict[asyncio.Future, tuple[int, int]] = {}
+    # chunks finish out of order: only the contiguous prefix is committed
+    done_chunks: dict[int, int] = {}
+    committed = reported = start
+    started_at = last_checkpoint = time.monotonic()
+    cancelled = cancellation(task_id)
+    cancel_wait = asyncio.ensure_future(cancelled.wait())
+    try:
+        while True:
+            # keep every worker busy
+            while len(in_flight) < in_flight_limit():
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                chunk_start, chunk_end = chunk
+                future = submit_search(fmt, algorithm, job_id, chunk_start, chunk_end)
+                in_flight[future] = chunk
+            if not in_flight:
+                break
 
-        # every N attempts (or time), check if we should stop:
-        if candidate % CANCEL_CHECK_INTERVAL == 0:
-            if not await should_continue(task_id):
+            done, _ = await asyncio.wait([*in_flight, cancel_wait], return_when=asyncio.FIRST_COMPLETED)
+            if cancelled.is_set():
                 logger.info(f"Task {task_id} cancelled—stopping early.")
-                return  # exit the loop
+                return None
+            for future in done:
+                chunk_start, chunk_end = in_flight.pop(future)
+                size = chunk_end - chunk_start + 1
+                done_chunks[chunk_start] = chunk_end
+                while committed in done_chunks:
+                    committed = done_chunks.pop(committed) + 1
+                for hash_value, phone_str in future.result().items():
+                    logger.info(
+                        f"[{task_id}] - FOUND Password!: password={phone_str}, hash={hash_value}")
+                    found[hash_value] = phone_str
 
-        if md5(phone_str.encode()).hexdigest() == hash_value:
-            # found it—report and return
-            logger.info(
-                f"[{task_id}] - FOUND Password!: password={phone_str}, hash={hash_value}")
-            await submit_result(minion_id, task_id, phone_str)
-            return
+                if (tried + size) // LOG_PROGRESS_INTERVAL != tried // LOG_PROGRESS_INTERVAL:
+                    pct = ((tried + size) / total) * 100
+                    rate = (tried + size) / max(time.monotonic() - started_at, 1e-9)
+                    logger.info(
+                        f"[{task_id}] - Progress: ({pct:.1f}%) rate={rate:,.0f} hashes/s")
+                tried += size
 
-    # exhausted slice, report no result
-    logger.info(
-        f"[{task_id}] - NO MATCH found in range ({start}, {end + 1})")
-    await submit_result(minion_id, task_id, "")
+            if len(found) == targets:
+                break
 
+            # between chunks, commit progress; its answer backs up the event stream
+            if committed > reported and time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                rate = tried / max(time.monotonic() - started_at, 1e-9)
+                alive = await submit_checkpoint(minion_id, task_id, committed, found, algorithm, rate)
+                reported, last_checkpoint = committed, time.monotonic()
+                if not alive:
+                    logger.info(f"Task {task_id} cancelled—stopping early.")
+                    return None
+    finally:
+        for future in in_flight:
+            future.cancel()
+        cancel_wait.cancel()
+        _cancellations.pop(task_id, None)
+        if tried:
+            record_hashrate(algorithm, tried / max(time.monotonic() - started_at, 1e-9))
 
-async def process_task_response(resp: httpx.Response, minion_id: str) -> bool:
-    """Process a task response from the master server.
-    Returns True if a task was processed, False if we should sleep and retry."""
-    if resp.status_code == 204:
-        logger.debug(f"No tasks available for minion {minion_id}")
-        return False
+    # exhausted slice (or every target found), report what we have
+    if not found:
+        logger.info(
+            f"[{task_id}] - NO MATCH found in range ({start}, {end + 1})")
+    return found
 
-    if resp.status_code != 200:
-        logger.error(f"Unexpected status {resp.status_code} from get-task")
-        return False
 
-    try:
-        task = GetTaskResponse(**resp.json())
-    except (ValueError, ValidationError) as e:
-        logger.error("Invalid GetTaskResponse payload", exc_info=e)
-        return False
+# targets of the jobs seen lately, fetched and published to the workers once per job
+_job_targets: dict[str, dict[bytes, dict[bytes, str]]] = {}
+JOB_TARGETS_CACHED = 4
+SALT_LENGTH = struct.Struct("<H")
+
+
+def unpack_targets(packed: bytes, algorithm: str) -> dict[bytes, dict[bytes, str]]:
+    """Group the packed targets of /jobs/{job_id}/targets by salt.
 
-    await crack_range(
+    Maps each salt (b"" for unsalted algorithms) to its targets, raw digests
+    mapped to their target strings.
+    """
+    hash_algorithm = ALGORITHMS[algorithm]
+    size = hash_algorithm.digest_size
+    if not hash_algorithm.salted:
+        return {b"": {packed[i:i + size]: packed[i:i + size].hex() for i in range(0, len(packed), size)}}
+
+    groups: dict[bytes, dict[bytes, str]] = {}
+    offset = 0
+    while offset < len(packed):
+        digest = packed[offset:offset + size]
+        (length,) = SALT_LENGTH.unpack_from(packed, offset + size)
+        offset += size + SALT_LENGTH.size
+        salt = packed[offset:offset + length]
+        offset += length
+        groups.setdefault(salt, {})[digest] = hash_algorithm.target(digest, salt)
+    return groups
+
+
+async def job_targets(job_id: str, algorithm: str) -> dict[bytes, dict[bytes, str]]:
+    """The targets of a job, grouped by salt (see `unpack_targets`).
+
+    They are published to the worker pool under the job id on first use.
+    """
+    if job_id not in _job_targets:
+        resp = await master_client().get(f"/jobs/{job_id}/targets")
+        resp.raise_for_status()
+        if len(_job_targets) >= JOB_TARGETS_CACHED:
+            evicted = next(iter(_job_targets))
+            del _job_targets[evicted]
+            retire_targets(evicted)
+        groups = unpack_targets(resp.content, algorithm)
+        await asyncio.to_thread(publish_targets, job_id, groups)
+        _job_targets[job_id] = groups
+    return _job_targets[job_id]
+
+
+async def sync_tasks(minion_id: str, results: list[UnitResult], hold: int, wait: float) -> list[WorkUnit]:
+    """Return finished units and get the units to search next, in one call.
+
+    Returns every unit the minion holds, oldest first; the master long-polls
+    the call for up to `wait` seconds if that would be none.
+    Raises on transport errors and unexpected responses.
+    """
+    algorithm, hashrate = current_hashrate()
+    payload = BatchRequest(
         minion_id=minion_id,
-        task_id=task.task_id,
-        hash_value=task.hash_value,
-        start=task.start,
-        end=task.end,
+        results=results,
+        hashrate=hashrate,
+        algorithm=algorithm,
+        hold=hold,
+        wait=wait
     )
-    return True
+    # the master may hold the call for `wait` seconds
+    resp = await master_client().post("/tasks/batch", json=payload.model_dump(),
+                                      timeout=httpx.Timeout(5.0, read=wait + 5.0))
+    resp.raise_for_status()
+    return BatchResponse(**resp.json()).units
@@ -0,0 +1,207 @@
+"""
+SQLite persistence for the master's jobs and work units.
+
+Every state transition is written as it happens (WAL mode), so a crash
+loses nothing and shutdown has nothing left to flush. On startup only the
+running jobs and their outstanding units are loaded; finished ones stay on
+disk and are read back on demand. A job's target hashes are written once,
+in their own table, so job updates never rewrite them; their count is kept
+with the job, so summaries never read them.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from models.models import HashTask, Job, JobStatus, JobSummary, TaskStatus
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id       TEXT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    remaining    TEXT NOT NULL,
+    searched     TEXT NOT NULL,
+    results      TEXT NOT NULL,
+    units_issued INTEGER NOT NULL,
+    priority     INTEGER NOT NULL DEFAULT 0,
+    weight       REAL NOT NULL DEFAULT 1,
+    algorithm    TEXT NOT NULL DEFAULT 'md5',
+    hash_count   INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS job_targets (
+    job_id      TEXT PRIMARY KEY,
+    hash_values TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id     TEXT PRIMARY KEY,
+    job_id      TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    assigned_to TEXT,
+    start       INTEGER NOT NULL,
+    end         INTEGER NOT NULL,
+    results     TEXT NOT NULL,
+    checkpoint  INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job_id);
+"""
+
+SCHEMA_VERSION = 6
+
+# scripts upgrading a database from the keyed version to the next one
+MIGRATIONS = {
+    2: "ALTER TABLE tasks ADD COLUMN checkpoint INTEGER;",
+    3: "ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0;"
+       "ALTER TABLE jobs ADD COLUMN weight REAL NOT NULL DEFAULT 1;",
+    4: "ALTER TABLE jobs ADD COLUMN algorithm TEXT NOT NULL DEFAULT 'md5';",
+    5: "ALTER TABLE jobs ADD COLUMN hash_count INTEGER NOT NULL DEFAULT 0;"
+       "UPDATE jobs SET hash_count = (SELECT json_array_length(hash_values) "
+       "FROM job_targets t WHERE t.job_id = jobs.job_id);",
+}
+
+JOB_COLUMNS = "job_id, status, remaining, searched, results, units_issued, priority, weight, algorithm"
+TASK_COLUMNS = "task_id, job_id, status, assigned_to, start, end, results, checkpoint"
+
+
+def _job_row(job: Job) -> tuple:
+    return (job.job_id, job.status.value, json.dumps(job.remaining), json.dumps(job.searched),
+            json.dumps(job.results), job.units_issued, job.priority, job.weight, job.algorithm)
+
+
+def _task_row(task_id: str, task: HashTask) -> tuple:
+    return (task_id, task.job_id, task.status.value, task.assigned_to, task.start, task.end,
+            json.dumps(task.results), task.checkpoint)
+
+
+def _job(row: tuple, hash_values: str) -> Job:
+    job_id, status, remaining, searched, results, units_issued, priority, weight, algorithm = row
+    return Job(
+        job_id=job_id,
+        hash_values=json.loads(hash_values),
+        status=JobStatus(status),
+        remaining=json.loads(remaining),
+        searched=json.loads(searched),
+        results=json.loads(results),
+        units_issued=units_issued,
+        priority=priority,
+        weight=weight,
+        algorithm=algorithm,
+    )
+
+
+def _task(row: tuple) -> tuple[str, HashTask]:
+    task_id, job_id, status, assigned_to, start, end, results, checkpoint = row
+    return task_id, HashTask(
+        job_id=job_id,
+        start=start,
+        end=end,
+        status=TaskStatus(status),
+        assigned_to=assigned_to,
+        results=json.loads(results),
+        checkpoint=checkpoint,
+    )
+
+
+class TaskDB:
+    """
+    Write-through job and task tables backed by SQLite in WAL mode.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # with WAL, NORMAL only risks the last commits on power loss, not corruption
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        (tables,) = self._conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()
+        while tables and version in MIGRATIONS:
+            self._conn.executescript(MIGRATIONS[version])
+            version += 1
+            self._conn.execute(f"PRAGMA user_version = {version}")
+        if tables and version != SCHEMA_VERSION:
+            self._conn.close()
+            raise RuntimeError(
+                f"{path} uses task schema {version}, expected {SCHEMA_VERSION}; move it away to start fresh")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        """Checkpoint the WAL and close the database."""
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.close()
+
+    def add_job(self, job: Job) -> None:
+        """Insert a new job with its targets."""
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("INSERT INTO job_targets (job_id, hash_values) VALUES (?, ?)",
+                               (job.job_id, json.dumps(job.hash_values)))
+            self._conn.execute(
+                f"INSERT INTO jobs ({JOB_COLUMNS}, hash_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _job_row(job) + (len(job.hash_values),))
+
+    def save(self, jobs: Iterable[Job] = (), tasks: Iterable[tuple[str, HashTask]] = ()) -> None:
+        """Update jobs and insert or update tasks, in one transaction."""
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, remaining = ?, searched = ?, results = ?, "
+                "units_issued = ?, priority = ?, weight = ?, algorithm = ? WHERE job_id = ?",
+                (_job_row(job)[1:] + (job.job_id,) for job in jobs))
+            self._conn.executemany(
+                f"INSERT INTO tasks ({TASK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (task_id) DO UPDATE SET status = excluded.status, "
+                "assigned_to = excluded.assigned_to, results = excluded.results, "
+                "checkpoint = excluded.checkpoint",
+                (_task_row(task_id, task) for task_id, task in tasks))
+
+    def get_task(self, task_id: str) -> Optional[HashTask]:
+        """Read a single task."""
+        row = self._conn.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return _task(row)[1] if row else None
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """Read a single job."""
+        row = self._conn.execute(
+            f"SELECT {JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        (hash_values,) = self._conn.execute(
+            "SELECT hash_values FROM job_targets WHERE job_id = ?", (job_id,)).fetchone()
+        return _job(row, hash_values)
+
+    def load_running(self) -> tuple[list[Job], dict[str, HashTask]]:
+        """The running jobs, oldest first, and their ASSIGNED tasks."""
+        rows = self._conn.execute(
+            f"SELECT {', '.join('j.' + c for c in JOB_COLUMNS.split(', '))}, t.hash_values "
+            "FROM jobs j JOIN job_targets t USING (job_id) WHERE j.status = ? ORDER BY j.rowid",
+            (JobStatus.RUNNING.value,))
+        jobs = [_job(row[:-1], row[-1]) for row in rows]
+        units = self._conn.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE status = ? AND job_id IN "
+            "(SELECT job_id FROM jobs WHERE status = ?) ORDER BY rowid",
+            (TaskStatus.ASSIGNED.value, JobStatus.RUNNING.value))
+        return jobs, dict(_task(row) for row in units)
+
+    def iter_job_summaries(self) -> Iterator[JobSummary]:
+        """The progress of every job ever stored, oldest first.
+
+        Results are only counted, by SQLite, and targets are not read at all.
+        """
+        rows = self._conn.execute(
+            "SELECT job_id, status, algorithm, priority, weight, hash_count, "
+            "(SELECT COUNT(*) FROM json_each(results)), searched FROM jobs ORDER BY rowid")
+        for job_id, status, algorithm, priority, weight, hashes, cracked, searched in rows:
+            yield JobSummary(job_id=job_id, status=JobStatus(status), algorithm=algorithm,
+                             priority=priority, weight=weight, hashes=hashes, cracked=cracked,
+                             searched=json.loads(searched))
+
+    def iter_tasks(self) -> Iterator[tuple[str, HashTask]]:
+        """Every task ever stored, oldest first."""
+        for row in self._conn.execute(f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY rowid"):
+            yield _task(row)
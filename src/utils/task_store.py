@@ -0,0 +1,463 @@
+"""
+Indexed job and task store for the master server.
+
+Jobs keep their keyspace as interval lists; work units (tasks) are carved
+out lazily when a minion asks for work, and their range is merged back into
+the job once searched. Only running jobs and outstanding units are held in
+memory, together with the indexes the hot paths need:
+
+* the jobs that still have work to hand out, with their scheduling pass,
+  and a heap of them for every priority and algorithm;
+* the ASSIGNED task ids of every minion;
+* the outstanding task ids and the target set of every running job;
+* the lease deadline of every outstanding task, and the speculative
+  duplicates ("twins") running the same range.
+
+An ASSIGNED task is leased to its minion for `lease_seconds`; heartbeats and
+progress checks renew the lease, and an expired lease gives the range back to
+the job. Once a job has no keyspace left to hand out, idle minions get a
+duplicate of its oldest outstanding task that has run for `straggler_seconds`,
+and whichever copy reports first wins. Minions search their units oldest
+first, so a unit counts as running once the units assigned before it on its
+minion are done (or from its first checkpoint), not while it waits in a
+minion's batch.
+
+Jobs are scheduled by priority, then by weighted fair share (stride
+scheduling): every unit carved advances its job's pass by its size over the
+job's weight, and the next unit comes from the job with the lowest pass in
+the highest priority that has work. A job joining a busy priority starts at
+the lowest pass there, so it shares from then on instead of catching up. A
+job that outranks outstanding units preempts as many of them as it has
+keyspace for, on minions that can crack it, losing the least work since the
+last checkpoint first: they are requeued like expired ones, keeping what was
+checkpointed. Only the units of lower-priority jobs are considered.
+
+Minions may only crack some hash algorithms: they are only handed units,
+and duplicates, of jobs whose algorithm they support.
+
+Within a job, units are carved from the ranges of `ranking` in order (most
+likely first, as ranked by the format), or in ascending order without one.
+
+Minions commit checkpoints while they search; when a task is requeued only
+the part after its checkpoint goes back to the job.
+
+`on_cancel`, if set, is called for every outstanding task the store cancels,
+so the master can tell the minion running it to stop.
+
+Every change is written through to the TaskDB, and all status changes must
+go through the store to keep the indexes in sync.
+"""
+
+import heapq
+import math
+import time
+from typing import Callable, Collection, Iterable, Iterator, Mapping, Optional
+
+from models.models import HashTask, Job, JobStatus, JobSummary, TaskStatus
+from utils.intervals import add_interval, interval_total, take_interval
+from utils.task_db import TaskDB
+
+
+class TaskStore:
+    """
+    Running jobs and outstanding tasks, with queue, per-minion and per-job indexes.
+    """
+
+    def __init__(self, db: TaskDB, lease_seconds: float, straggler_seconds: float,
+                 ranking: Optional[list[tuple[int, int]]] = None) -> None:
+        self._db = db
+        self._ranking = ranking
+        self._lease_seconds = lease_seconds
+        self._straggler_seconds = straggler_seconds
+        self.jobs: dict[str, Job] = {}
+        self.tasks: dict[str, HashTask] = {}
+        self._pass: dict[str, float] = {}
+        # (priority, algorithm) -> heap of (pass, job id); entries whose pass
+        # or priority is no longer the job's are dropped when they surface
+        self._queues: dict[tuple[int, str], list[tuple[float, str]]] = {}
+        self._assigned: dict[str, set[str]] = {}
+        self._job_tasks: dict[str, set[str]] = {}
+        self._job_targets: dict[str, set[str]] = {}
+        self._assigned_at: dict[str, float] = {}
+        self._started_at: dict[str, float] = {}
+        self._checkpointed_at: dict[str, float] = {}
+        self._lease: dict[str, float] = {}
+        self._twins: dict[str, set[str]] = {}
+        self.on_cancel: Optional[Callable[[str, HashTask], None]] = None
+
+        jobs, tasks = db.load_running()
+        for job in jobs:
+            self._index_job(job)
+        for task_id, task in tasks.items():
+            self._index_task(task_id, task)
+
+    def close(self) -> None:
+        """Close the backing database."""
+        self._db.close()
+
+    def _index_job(self, job: Job) -> None:
+        self.jobs[job.job_id] = job
+        self._job_tasks[job.job_id] = set()
+        self._job_targets[job.job_id] = set(job.hash_values)
+        self._enqueue(job.job_id)
+
+    def _index_task(self, task_id: str, task: HashTask) -> None:
+        # tasks loaded after a restart get a fresh lease
+        now = time.monotonic()
+        self.tasks[task_id] = task
+        if not self._assigned.get(task.assigned_to):
+            self._started_at[task_id] = now
+        self._assigned.setdefault(task.assigned_to, set()).add(task_id)
+        self._job_tasks[task.job_id].add(task_id)
+        self._assigned_at[task_id] = now
+        self._lease[task_id] = now + self._lease_seconds
+
+    def _unindex_task(self, task_id: str) -> HashTask:
+        task = self.tasks.pop(task_id)
+        self._assigned.get(task.assigned_to, set()).discard(task_id)
+        self._job_tasks[task.job_id].discard(task_id)
+        del self._assigned_at[task_id]
+        self._started_at.pop(task_id, None)
+        self._checkpointed_at.pop(task_id, None)
+        del self._lease[task_id]
+        self._start_next(task.assigned_to)
+        twins = self._twins.pop(task_id, None)
+        if twins is not None:
+            twins.discard(task_id)
+            # a lone survivor is an ordinary task again
+            if len(twins) == 1:
+                del self._twins[next(iter(twins))]
+        return task
+
+    def _start_next(self, minion_id: str) -> None:
+        """Start the clock of a minion's oldest task once it runs nothing else."""
+        held = self._assigned.get(minion_id)
+        if held and not any(task_id in self._started_at for task_id in held):
+            self._started_at[min(held, key=self._assigned_at.__getitem__)] = time.monotonic()
+
+    def _cancel(self, task_id: str) -> HashTask:
+        """Drop an outstanding task as CANCELLED and notify `on_cancel`."""
+        task = self._unindex_task(task_id)
+        task.status = TaskStatus.CANCELLED
+        if self.on_cancel is not None:
+            self.on_cancel(task_id, task)
+        return task
+
+    def _enqueue(self, job_id: str) -> None:
+        job = self.jobs[job_id]
+        if job_id not in self._pass and job.remaining:
+            # join at the front of the pack, not behind jobs that ran for hours
+            heads = [self._head(key) for key in list(self._queues) if key[0] == job.priority]
+            self._pass[job_id] = min((head[0] for head in heads if head), default=0.0)
+            heapq.heappush(self._queues.setdefault((job.priority, job.algorithm), []),
+                           (self._pass[job_id], job_id))
+
+    def _head(self, key: tuple[int, str]) -> Optional[tuple[float, str]]:
+        """The (pass, job id) with the lowest pass in a queue, dropping stale entries."""
+        queue = self._queues[key]
+        while queue:
+            pass_, job_id = queue[0]
+            if self._pass.get(job_id) == pass_ and self.jobs[job_id].priority == key[0]:
+                return queue[0]
+            heapq.heappop(queue)
+        del self._queues[key]
+        return None
+
+    def _preempt(self, job: Job, minions: Optional[dict[str, int]]) -> list[tuple[str, HashTask]]:
+        """Requeue tasks of lower priority than `job` to make room for it.
+
+        `minions` maps the minions that can crack the job to the size of the
+        units they get (None: every minion, with units of one number). Only
+        their tasks are taken, the ones with the least work since their last
+        checkpoint first, and only until the units the job would carve for
+        them cover its remaining keyspace.
+        """
+        left = interval_total(job.remaining)
+        if not left:
+            return []
+        victims = [task_id for other in self.jobs.values() if other.priority < job.priority
+                   for task_id in self._job_tasks[other.job_id]
+                   if minions is None or self.tasks[task_id].assigned_to in minions]
+        # the unsaved work of a task is what it did since its last checkpoint
+        # (or start); a task still waiting on its minion has none
+        victims.sort(key=lambda task_id: -self._checkpointed_at.get(
+            task_id, self._started_at.get(task_id, math.inf)))
+        chosen = []
+        for task_id in victims:
+            if left <= 0:
+                break
+            chosen.append(task_id)
+            left -= 1 if minions is None else minions[self.tasks[task_id].assigned_to]
+        return self._requeue(chosen)
+
+    def add_job(self, job: Job, minions: Optional[dict[str, int]] = None) -> list[tuple[str, HashTask]]:
+        """Store a new job; it is scheduled if it still has keyspace to search.
+
+        Returns the tasks of lower-priority jobs it preempted (see `_preempt`
+        for `minions`).
+        """
+        self._db.add_job(job)
+        if job.status != JobStatus.RUNNING:
+            return []
+        self._index_job(job)
+        return self._preempt(job, minions)
+
+    def set_priority(self, job_id: str, priority: int, weight: float,
+                     minions: Optional[dict[str, int]] = None) -> list[tuple[str, HashTask]]:
+        """Reschedule a running job. Returns the tasks it preempted."""
+        job = self.jobs[job_id]
+        job.priority, job.weight = priority, weight
+        self._db.save(jobs=[job])
+        if self._pass.pop(job_id, None) is not None:
+            self._enqueue(job_id)
+        return self._preempt(job, minions)
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """A job by id; finished jobs are read from disk."""
+        return self.jobs.get(job_id) or self._db.get_job(job_id)
+
+    def get(self, task_id: str) -> Optional[HashTask]:
+        """A task by id; finished tasks are read from disk."""
+        return self.tasks.get(task_id) or self._db.get_task(task_id)
+
+    def items(self) -> Iterator[tuple[str, HashTask]]:
+        """Every task, including the finished ones kept on disk."""
+        for task_id, task in self._db.iter_tasks():
+            # the in-memory copy is the live one
+            yield task_id, self.tasks.get(task_id, task)
+
+    def iter_job_summaries(self) -> Iterator[JobSummary]:
+        """The progress of every job, including the finished ones kept on disk."""
+        for summary in self._db.iter_job_summaries():
+            # the in-memory copy is the live one
+            job = self.jobs.get(summary.job_id)
+            yield summary if job is None else job.summary()
+
+    def assigned_tasks(self, minion_id: str) -> list[tuple[str, HashTask]]:
+        """The tasks currently ASSIGNED to a minion, oldest first."""
+        task_ids = sorted(self._assigned.get(minion_id, ()),
+                          key=self._assigned_at.__getitem__)
+        return [(task_id, self.tasks[task_id]) for task_id in task_ids]
+
+    def assigned_to(self, minion_id: str) -> Optional[tuple[str, HashTask]]:
+        """The oldest task currently ASSIGNED to a minion, if any."""
+        assigned = self.assigned_tasks(minion_id)
+        return assigned[0] if assigned else None
+
+    def assigned_count(self, minion_id: str) -> int:
+        """How many tasks are ASSIGNED to a minion."""
+        return len(self._assigned.get(minion_id, ()))
+
+    def _new_task(self, job: Job, minion_id: str, start: int, end: int) -> tuple[str, HashTask]:
+        job.units_issued += 1
+        task_id = f"{job.job_id}_{job.units_issued}"
+        task = HashTask(job_id=job.job_id, start=start, end=end,
+                        status=TaskStatus.ASSIGNED, assigned_to=minion_id)
+        self._index_task(task_id, task)
+        self._db.save(jobs=[job], tasks=[(task_id, task)])
+        return task_id, task
+
+    def _next_job(self, algorithms: Optional[Collection[str]] = None) -> Optional[Job]:
+        """The job the next unit is carved from: highest priority, then lowest pass,
+        among the jobs of `algorithms` (all jobs if None)."""
+        for priority in sorted({key[0] for key in self._queues}, reverse=True):
+            heads = [self._head(key) for key in list(self._queues) if key[0] == priority
+                     and (algorithms is None or key[1] in algorithms)]
+            heads = [head for head in heads if head]
+            if heads:
+                return self.jobs[min(heads)[1]]
+        return None
+
+    def assign_next(self, minion_id: str, sizes: Mapping[str, int]) -> Optional[tuple[str, HashTask]]:
+        """Carve a unit from the job whose turn it is, among the jobs of the
+        algorithms in `sizes`, of up to as many numbers as `sizes` gives for
+        the job's algorithm.
+
+        When no such job has keyspace left, duplicate a straggling task instead.
+        """
+        job = self._next_job(sizes)
+        if job is None:
+            return self._speculate(minion_id, sizes)
+
+        start, end = take_interval(job.remaining, sizes[job.algorithm], self._ranking)
+        queue = self._queues[(job.priority, job.algorithm)]
+        if job.remaining:
+            self._pass[job.job_id] += (end - start + 1) / job.weight
+            heapq.heapreplace(queue, (self._pass[job.job_id], job.job_id))
+        else:
+            del self._pass[job.job_id]
+            heapq.heappop(queue)
+        return self._new_task(job, minion_id, start, end)
+
+    def _speculate(self, minion_id: str,
+                   algorithms: Optional[Collection[str]] = None) -> Optional[tuple[str, HashTask]]:
+        """Duplicate the oldest outstanding task that has run for `straggler_seconds`."""
+        cutoff = time.monotonic() - self._straggler_seconds
+        stragglers = [
+            task_id for task_id, started_at in self._started_at.items()
+            if started_at <= cutoff and task_id not in self._twins
+            and self.tasks[task_id].assigned_to != minion_id
+            and (algorithms is None or self.jobs[self.tasks[task_id].job_id].algorithm in algorithms)
+        ]
+        if not stragglers:
+            return None
+
+        original_id = min(stragglers, key=self._started_at.__getitem__)
+        original = self.tasks[original_id]
+        task_id, task = self._new_task(
+            self.jobs[original.job_id], minion_id, original.resume_from, original.end)
+        twins = {original_id, task_id}
+        self._twins[original_id] = self._twins[task_id] = twins
+        return task_id, task
+
+    def renew_minion(self, minion_id: str) -> None:
+        """Extend the leases of every task ASSIGNED to a minion."""
+        deadline = time.monotonic() + self._lease_seconds
+        for task_id in self._assigned.get(minion_id, ()):
+            self._lease[task_id] = deadline
+
+    def renew(self, task_id: str) -> None:
+        """Extend the lease of an outstanding task."""
+        if task_id in self._lease:
+            self._lease[task_id] = time.monotonic() + self._lease_seconds
+
+    def checkpoint(self, task_id: str, offset: int, results: dict[str, str]) -> Optional[Job]:
+        """Record that an outstanding task searched everything before `offset`.
+
+        The searched prefix counts towards the job's searched keyspace, and
+        hits found so far are merged into the task and its job, which
+        completes if they crack every target. Also renews the lease.
+        Returns the job, or None if the task is no longer outstanding.
+        """
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        job = self.jobs[task.job_id]
+        if task.resume_from < offset <= task.end + 1:
+            task.checkpoint = offset
+            self._checkpointed_at[task_id] = time.monotonic()
+            self._started_at.setdefault(task_id, self._checkpointed_at[task_id])
+            add_interval(job.searched, task.start, offset - 1)
+        task.results.update(results)
+        job.results.update(results)
+        self.renew(task_id)
+
+        changed = [(task_id, task)]
+        if self.is_job_cracked(job.job_id):
+            changed += self._finish_job(job, JobStatus.COMPLETED)
+        self._db.save(jobs=[job], tasks=changed)
+        return job
+
+    def add_results(self, job_id: str, results: dict[str, str]) -> Optional[Job]:
+        """Merge hits found outside the job's tasks (by a lookup) into a running job.
+
+        The job completes if they crack every target. Returns the job, or None
+        if it is no longer running.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.results.update(results)
+        changed = []
+        if self.is_job_cracked(job_id):
+            changed = self._finish_job(job, JobStatus.COMPLETED)
+        self._db.save(jobs=[job], tasks=changed)
+        return job
+
+    def _credit_checkpoint(self, job: Job, task: HashTask) -> None:
+        """Count the part of a cancelled task before its checkpoint as searched."""
+        if task.resume_from > task.start:
+            add_interval(job.searched, task.start, task.resume_from - 1)
+
+    def expire_leases(self) -> list[tuple[str, HashTask]]:
+        """Cancel every task whose lease ran out, giving its range back to its job."""
+        now = time.monotonic()
+        expired = [task_id for task_id,
+                   deadline in self._lease.items() if deadline < now]
+        return self._requeue(expired)
+
+    def complete(self, task_id: str, results: dict[str, str]) -> Optional[Job]:
+        """Mark a task COMPLETED, merging its range and results into its job.
+
+        The job completes once every target is cracked or its whole keyspace
+        is searched; its outstanding tasks are then cancelled. Returns the job.
+        """
+        task = self.tasks.get(task_id)
+        changed: list[tuple[str, HashTask]] = []
+        if task is None:
+            # a late result for a cancelled task: keep what it found
+            task = self._db.get_task(task_id)
+            if task is None:
+                return None
+            job = self.get_job(task.job_id)
+        else:
+            # first result wins: stop the duplicates of this range
+            job = self.jobs[task.job_id]
+            for twin_id in self._twins.get(task_id, set()) - {task_id}:
+                twin = self._cancel(twin_id)
+                self._credit_checkpoint(job, twin)
+                changed.append((twin_id, twin))
+            self._unindex_task(task_id)
+            add_interval(job.searched, task.start, task.end)
+
+        task.status = TaskStatus.COMPLETED
+        task.results = results
+        job.results.update(results)
+        changed.append((task_id, task))
+
+        if job.job_id in self.jobs and (
+                self.is_job_cracked(job.job_id) or not (job.remaining or self._job_tasks[job.job_id])):
+            changed += self._finish_job(job, JobStatus.COMPLETED)
+        self._db.save(jobs=[job], tasks=changed)
+        return job
+
+    def is_job_cracked(self, job_id: str) -> bool:
+        """Check whether every target hash of a running job has been cracked."""
+        return self._job_targets[job_id] <= self.jobs[job_id].results.keys()
+
+    def _finish_job(self, job: Job, status: JobStatus) -> list[tuple[str, HashTask]]:
+        """Drop a job from memory, cancelling its outstanding tasks."""
+        job.status = status
+        cancelled = []
+        for task_id in list(self._job_tasks[job.job_id]):
+            task = self._cancel(task_id)
+            self._credit_checkpoint(job, task)
+            cancelled.append((task_id, task))
+        del self.jobs[job.job_id]
+        self._pass.pop(job.job_id, None)
+        del self._job_tasks[job.job_id]
+        del self._job_targets[job.job_id]
+        return cancelled
+
+    def cancel_job(self, job_id: str) -> None:
+        """Cancel a running job and its outstanding tasks."""
+        job = self.jobs[job_id]
+        cancelled = self._finish_job(job, JobStatus.CANCELLED)
+        self._db.save(jobs=[job], tasks=cancelled)
+
+    def requeue_minion(self, minion_id: str) -> None:
+        """Cancel a minion's ASSIGNED tasks and give their ranges back to their jobs."""
+        self._requeue(list(self._assigned.pop(minion_id, ())))
+
+    def _requeue(self, task_ids: Iterable[str]) -> list[tuple[str, HashTask]]:
+        """Cancel tasks; the rest of a range after its checkpoint goes back to
+        its job, unless a twin still runs it."""
+        jobs: dict[str, Job] = {}
+        cancelled = []
+        for task_id in task_ids:
+            twins = self._twins.get(task_id, set())
+            task = self._cancel(task_id)
+            cancelled.append((task_id, task))
+            job = self.jobs[task.job_id]
+            jobs[job.job_id] = job
+            self._credit_checkpoint(job, task)
+            if twins or task.resume_from > task.end:
+                continue
+            add_interval(job.remaining, task.resume_from, task.end)
+            self._enqueue(job.job_id)
+        for job in jobs.values():
+            # a task checkpointed to its end may have been the last of its job
+            if job.job_id in self.jobs and not (job.remaining or self._job_tasks[job.job_id]):
+                self._finish_job(job, JobStatus.COMPLETED)
+        self._db.save(jobs=jobs.values(), tasks=cancelled)
+        return cancelled
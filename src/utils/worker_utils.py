@@ -0,0 +1,165 @@
+"""
+Worker process helpers for the minion and the crack CLI.
+
+The CPU-bound search runs in a process pool so the minion's event loop stays
+free for heartbeats, cancellation checks and health checks.
+
+Targets are not sent with every chunk: they are published once under a key
+(the job id on a minion), as a pickle in a directory shared with the
+workers, and each worker loads them on its first chunk of that key and keeps
+the last TARGETS_CACHED sets. A chunk is then only `(key, start, end)`.
+"""
+
+import asyncio
+import atexit
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Generator, Optional
+
+from algorithms import ALGORITHMS, DEFAULT_ALGORITHM
+from engines import ENGINES, CrackEngine
+from formatters.base_formats import FormatStrategy
+
+_pool: Optional[ProcessPoolExecutor] = None
+_workers = 1
+
+# the engine used inside each worker process, set by the pool initializer
+_engine: Optional[CrackEngine] = None
+
+# where published targets are written, and the targets a worker loaded from it
+_targets_dir: Optional[str] = None
+_targets: dict[str, dict[bytes, dict[bytes, str]]] = {}
+TARGETS_CACHED = 4
+
+
+def _init_worker(engine_name: str, targets_dir: str) -> None:
+    """Select the hashing engine of a worker process and where it finds targets."""
+    global _engine, _targets_dir
+    _engine = ENGINES[engine_name]
+    _targets_dir = targets_dir
+
+
+def _shared_targets_dir() -> str:
+    """The directory targets are published in, removed when this process exits."""
+    global _targets_dir
+    if _targets_dir is None:
+        _targets_dir = tempfile.mkdtemp(prefix="crack-targets-")
+        atexit.register(shutil.rmtree, _targets_dir, ignore_errors=True)
+    return _targets_dir
+
+
+def new_worker_pool(workers: int, engine_name: str) -> ProcessPoolExecutor:
+    """A process pool whose workers run `search_range` with the named engine."""
+    return ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_worker,
+                               initargs=(engine_name, _shared_targets_dir()))
+
+
+def publish_targets(key: str, groups: dict[bytes, dict[bytes, str]]) -> None:
+    """Make targets available to the workers under `key`.
+
+    A key must not be published twice with other targets: workers keep what
+    they loaded. `groups` is laid out as in `search_range`.
+    """
+    path = os.path.join(_shared_targets_dir(), key)
+    with open(f"{path}.tmp", "wb") as f:
+        pickle.dump(groups, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{path}.tmp", path)
+
+
+def retire_targets(key: str) -> None:
+    """Drop published targets no chunk will be searched against anymore."""
+    try:
+        os.remove(os.path.join(_shared_targets_dir(), key))
+    except FileNotFoundError:
+        pass
+
+
+def _load_targets(key: str) -> dict[bytes, dict[bytes, str]]:
+    """The targets published under `key`, read once per worker process."""
+    groups = _targets.get(key)
+    if groups is None:
+        with open(os.path.join(_targets_dir, key), "rb") as f:
+            groups = pickle.load(f)
+        if len(_targets) >= TARGETS_CACHED:
+            del _targets[next(iter(_targets))]
+        _targets[key] = groups
+    return groups
+
+
+def start_worker_pool(workers: int, engine_name: str) -> None:
+    """Create the process pool used for cracking."""
+    global _pool, _workers
+    _workers = max(1, workers)
+    _pool = new_worker_pool(_workers, engine_name)
+
+
+def stop_worker_pool() -> None:
+    """Shut down the process pool, dropping queued chunks."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def in_flight_limit() -> int:
+    """How many chunks to keep queued so every worker stays busy."""
+    return 2 * _workers
+
+
+def chunk_range(start: int, end: int, size: int) -> Generator[tuple[int, int], None, None]:
+    """Yield consecutive [start..end] sub-ranges of at most `size` numbers."""
+    current = start
+    while current <= end:
+        chunk_end = min(current + size - 1, end)
+        yield current, chunk_end
+        current = chunk_end + 1
+
+
+def search_range(fmt: FormatStrategy, algorithm_name: str, key: str,
+                 start: int, end: int) -> dict[str, str]:
+    """Hash every candidate in [start..end] and return the targets it cracked.
+
+    Runs inside a worker process, against the targets published under
+    `key`. They map each salt to the targets salted with it, as raw digests
+    mapped to their target strings; every salt group is one pass over the
+    range (unsalted targets are the single group b"").
+    """
+    algorithm = ALGORITHMS[algorithm_name]
+    found: dict[str, str] = {}
+    for salt, targets in _load_targets(key).items():
+        found.update(_engine.search(fmt, targets, start, end, algorithm, salt))
+    return found
+
+
+def submit_search(fmt: FormatStrategy, algorithm_name: str, key: str,
+                  start: int, end: int) -> "asyncio.Future[dict[str, str]]":
+    """Run `search_range` in the pool and return an awaitable future."""
+    if _pool is None:
+        raise RuntimeError("Worker pool is not started")
+    return asyncio.wrap_future(_pool.submit(search_range, fmt, algorithm_name, key, start, end))
+
+
+async def measure_hashrate(fmt: FormatStrategy, size: int, algorithm_name: str = DEFAULT_ALGORITHM) -> float:
+    """Measure the hashes per second of the whole pool with one algorithm (unsalted).
+
+    Every worker searches `size` numbers from the start of the keyspace, after
+    a tiny warm-up round so process start-up is not counted.
+    """
+    algorithm = ALGORITHMS[algorithm_name]
+    unreachable = bytes(algorithm.digest_size)
+    key = "hashrate"
+    publish_targets(key, {b"": {unreachable: algorithm.target(unreachable)}})
+    start = fmt.min_value
+    await asyncio.gather(*(submit_search(fmt, algorithm_name, key, start, start)
+                           for _ in range(_workers)))
+
+    end = min(start + size * _workers - 1, fmt.max_value)
+    started_at = time.monotonic()
+    await asyncio.gather(*(submit_search(fmt, algorithm_name, key, chunk_start, chunk_end)
+                           for chunk_start, chunk_end in chunk_range(start, end, size)))
+    retire_targets(key)
+    return (end - start + 1) / max(time.monotonic() - started_at, 1e-9)